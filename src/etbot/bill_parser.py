@@ -0,0 +1,79 @@
+import datetime
+import re
+from collections import OrderedDict
+
+from disnake import Message, Role
+
+# matches bills built by assemble_bill and assemble_amendment, regardless of the exact spacing
+_bill_pattern: re.Pattern = re.compile(
+    r"^\s*(?P<heading>\*\*Bill\s*(?P<number>\d+)\s*:\s*\*\*"
+    r"(?:\s*Amendment\s+to\s+\*\*Bill\s*(?P<parent>\d+)\s*\*\*)?)"
+    r"\s*(?P<body>.*?)\s*"
+    r"(?:Bill\s+by:\s*(?P<author><@!?(?P<author_id>\d+)>))?"
+    r"\s*(?P<roles>(?:<@&\d+>\s*)*)$",
+    re.DOTALL)
+_role_pattern: re.Pattern = re.compile(r"<@&(\d+)>")
+
+_cache_size: int = 1024
+_cache: OrderedDict = OrderedDict()
+
+
+class ParsedBill:
+    """
+    The parts of a bill message.
+    """
+
+    def __init__(self, number: int, parent: int | None, heading: str, body: str, author: str | None,
+                 author_id: int | None, role_ids: list[int]):
+        self.number: int = number
+        self.parent: int | None = parent
+        self.heading: str = heading
+        self.body: str = body
+        self.author: str | None = author
+        self.author_id: int | None = author_id
+        self.role_ids: list[int] = role_ids
+
+    def is_amendment(self) -> bool:
+        return self.parent is not None
+
+    def mentions(self, role: Role | None) -> bool:
+        return role is not None and role.id in self.role_ids
+
+    def wording(self) -> str:
+        return f"{self.heading} \r\n{self.body}"
+
+
+def parse_content(content: str) -> ParsedBill | None:
+    """
+    Parses the content of a bill message. Returns None if it is no bill.
+    """
+    match: re.Match | None = _bill_pattern.match(content)
+    if match is None:
+        return None
+
+    parent: str | None = match.group("parent")
+    author_id: str | None = match.group("author_id")
+    return ParsedBill(int(match.group("number")),
+                      None if parent is None else int(parent),
+                      match.group("heading"),
+                      match.group("body"),
+                      match.group("author"),
+                      None if author_id is None else int(author_id),
+                      [int(role_id) for role_id in _role_pattern.findall(match.group("roles"))])
+
+
+def parse_message(message: Message) -> ParsedBill | None:
+    """
+    Parses a bill message, every version of a message is only parsed once.
+    """
+    edited_at: datetime.datetime | None = message.edited_at
+    key: tuple[int, float | None] = (message.id, None if edited_at is None else edited_at.timestamp())
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    parsed: ParsedBill | None = parse_content(message.content)
+    _cache[key] = parsed
+    if len(_cache) > _cache_size:
+        _cache.popitem(last=False)
+    return parsed
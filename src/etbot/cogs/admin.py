@@ -4,6 +4,9 @@ from disnake.ext import commands
 from disnake.ext.commands import ExtensionNotFound, ExtensionAlreadyLoaded, ExtensionFailed, NoEntryPointError, \
     ExtensionNotLoaded
 
+import utils
+from vars import router
+
 
 def setup(bot: commands.Bot) -> None:
     bot.add_cog(Admin(bot))
@@ -55,6 +58,20 @@ class Admin(commands.Cog):
             return
         await ctx.send("Cog reloaded.")
 
+    @commands.command(name="routes", aliases=["Routes"],
+                      brief="Replies with the message routes and how long their handlers take.")
+    @commands.has_guild_permissions(administrator=True)
+    async def routes(self, ctx: commands.Context):
+        lines: list[str] = ["Routes:"]
+        for channel_id, handlers in router.get_routes().items():
+            lines.append(f"<#{channel_id}>: {', '.join(handler.__qualname__ for handler in handlers)}")
+        lines.append("Handlers:")
+        for name, (calls, total, slowest) in router.get_timings().items():
+            lines.append(f"{name}: {calls} calls, {total / calls * 1000:.2f} ms average, "
+                         f"{slowest * 1000:.2f} ms slowest")
+        for page in utils.paginate(lines):
+            await ctx.send(page)
+
     @commands.command(name="ip", aliases=["IP"],
                       brief="Replies with the server's IP.")
     @commands.has_guild_permissions(administrator=True)
@@ -1,10 +1,14 @@
 import logging
 
-from disnake import Message
-from disnake.ext import commands
+from disnake import Message, Thread, TextChannel
+from disnake.ext import commands, tasks
 
+import scheduling
 import utils
-from vars import channels, emojis
+from vars import channels, deletions, emojis, roles, router
+
+# seconds until the scheduled deletions are tried again after they failed
+_retry_delay: float = 60
 
 
 def setup(bot):
@@ -28,29 +32,73 @@ async def delete_noise(message: Message):
         logging.debug(f"Embed or attachment found in message with ID {message.id} in channel {message.channel.name}.")
         return
 
-    await message.delete(delay=60 * 60)  # delete message after 1 hour
+    await deletions.schedule(message.id, message.channel.id)
 
 
 class MemeVoting(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-
-    @commands.Cog.listener()
-    async def on_message(self, message: Message):
+        deletions.init_deletions()
+        self.run_deletions.start()
+        router.register(self.qualified_name, self.route_meme, channels.get_memes, channels.get_religious_memes)
+        router.register(self.qualified_name, self.route_noise, channels.get_out_of_context_screenshots)
+
+    def cog_unload(self) -> None:
+        router.unregister(self.qualified_name)
+        self.run_deletions.cancel()
+
+    @tasks.loop()
+    async def run_deletions(self):
+        """
+        Sleeps until the earliest scheduled deletion and deletes every message that is due in one go.
+        """
+        deletions.changed.clear()
+        try:
+            due: float | None = await deletions.next_due()
+            if due is None or due > deletions.now():
+                await scheduling.wait(deletions.changed, None if due is None else due - deletions.now())
+                return
+            await self.delete_due()
+        except Exception:
+            logging.exception("Running the scheduled deletions failed")
+            # retried after a while instead of in a busy loop or never again
+            await scheduling.wait(deletions.changed, _retry_delay)
+
+    @run_deletions.before_loop
+    async def before_deletions(self):
+        # the channels of the due messages are looked up in the cache, which is filled once the bot is ready
+        await self.bot.wait_until_ready()
+
+    async def delete_due(self):
+        for channel_id, message_ids in (await deletions.get_due()).items():
+            channel = self.bot.get_channel(channel_id)
+            try:
+                if channel is not None:
+                    await utils.delete_messages(channel, message_ids)
+            except Exception:
+                logging.exception(f"Deleting {len(message_ids)} messages in {channel_id} failed")
+            # removed either way, so a channel the bot lost access to does not block the schedule
+            await deletions.cancel(message_ids)
+
+    async def route_meme(self, message: Message):
         # no reaction if bot
-        if message.author.bot:
-            return
-
-        meme_channels = [channels.get_memes(), channels.get_religious_memes()]
-        delete_noise_channels = [channels.get_out_of_context_screenshots()]
-
-        # meme voting
-        if message.channel in meme_channels:
+        if not message.author.bot:
             await vote_on_meme(message)
-        # delete noise
-        if message.channel in delete_noise_channels:
+
+    async def route_noise(self, message: Message):
+        if not message.author.bot:
             await delete_noise(message)
 
+    @commands.command(name="deleteDelay", aliases=["deletedelay"],
+                      brief="Sets after how many minutes text messages are deleted in a channel.",
+                      help="Sets after how many minutes text messages without an embed or attachment are deleted in "
+                           "the given channel. \n"
+                           "Only affects messages sent afterwards.")
+    @commands.check(roles.check_is_staff)
+    async def delete_delay(self, ctx: commands.Context, channel: TextChannel | Thread, minutes: float):
+        deletions.set_delay(channel.id, max(minutes, 0) * 60)
+        await ctx.send(f"Text messages in {channel.mention} are deleted after {max(minutes, 0):g} minutes.")
+
     @commands.command(name="meme", aliases=["Meme"],
                       brief="Adds the meme voting reactions to the referenced message.",
                       help="Adds the meme voting reactions to the referenced message.")
@@ -1,13 +1,44 @@
+import asyncio
 import datetime
+import io
+import logging
 import os
-import random
+import re
 import uuid
+from collections import OrderedDict
+from typing import IO, Awaitable, Callable, Literal
 
-from disnake import Message, Member, User, Guild, Thread, File, NotFound
+from disnake import Message, Member, User, Guild, Thread, File, HTTPException, NotFound, Forbidden, TextChannel, \
+    RawMessageUpdateEvent, RawMessageDeleteEvent, RawBulkMessageDeleteEvent
 from disnake.abc import GuildChannel
-from disnake.ext import commands
-
-from vars import channels, roles, warnings
+from disnake.ext import commands, tasks
+
+import scheduling
+import storage
+import utils
+from vars import archive, attachments, channels, ledger, roles, router, transcripts, warnings
+
+# how many channels are crawled at the same time
+_concurrent_channels: int = 4
+# seconds between two progress updates of a save
+_progress_interval: float = 10
+
+# bytes of attachments a single purge or save downloads into the attachment store
+_attachment_budget: int = 500 * 1024 ** 2
+# warnings shown on one page of a listing
+_warnings_per_page: int = 5
+# moderation actions shown on one page of &modlog
+_modlog_per_page: int = 10
+# how many referenced messages are fetched at the same time, and how many are remembered across purges
+_concurrent_references: int = 5
+_cached_references: int = 1024
+# purged messages rendered before they are handed to the transcript writer together
+_transcript_chunk: int = 500
+
+_crawl_limit: asyncio.Semaphore = asyncio.Semaphore(_concurrent_channels)
+_reference_limit: asyncio.Semaphore = asyncio.Semaphore(_concurrent_references)
+# message id -> content, or None for deleted messages, least recently used first
+_references: OrderedDict[int, str | None] = OrderedDict()
 
 
 def setup(bot: commands.Bot) -> None:
@@ -15,63 +46,374 @@ def setup(bot: commands.Bot) -> None:
     print("Loaded Moderation Cog.")
 
 
-async def make_message_writeable(message: Message) -> str:
+def make_message_writeable(message: Message, references: dict[int, str | None], stored: dict[str, str]) -> str:
     """
-    Makes a message writeable.
+    Makes a message writeable. The referenced messages have to be resolved with resolve_references,
+    stored maps the urls of the attachments kept in the attachment store to their hashes.
     """
     txt: str = f"Author: {message.author.name}#{message.author.discriminator}\n" \
                f"Created at: {message.created_at}\n"
 
     if message.reference is not None:
-        try:
-            txt += f"Replying to: {(await message.channel.fetch_message(message.reference.message_id)).clean_content}\n"
-        except NotFound:
-            txt += f"Replying to: {message.reference.message_id}\n"
+        reference: str | None = references.get(message.reference.message_id)
+        txt += f"Replying to: {message.reference.message_id if reference is None else reference}\n"
 
     if len(message.attachments) > 0:
-        txt += f"Attachments: {message.attachments}\n"
+        txt += f"Attachments: {attachments.describe(message, stored)}\n"
     txt += f"Content: \n" \
            f"{message.clean_content}\n\n\n"
 
     return txt
 
 
-async def messages_by_user_in_guild(guild: Guild, user: User | Member) -> int:
+def _cache_reference(message_id: int, content: str | None) -> None:
+    _references[message_id] = content
+    _references.move_to_end(message_id)
+    while len(_references) > _cached_references:
+        _references.popitem(last=False)
+
+
+async def resolve_references(channel: GuildChannel | Thread, messages: list[Message],
+                             known: list[Message]) -> dict[int, str | None]:
+    """
+    Returns the content of every message the given messages reply to.
+    References are looked up in the known messages first, then in the cache, and only the rest is fetched.
+    """
+    window: dict[int, Message] = {message.id: message for message in known}
+    references: dict[int, str | None] = {}
+    missing: set[int] = set()
+    for message in messages:
+        if message.reference is None or message.reference.message_id is None:
+            continue
+        message_id: int = message.reference.message_id
+        if message_id in window:
+            references[message_id] = window[message_id].clean_content
+        elif message_id in _references:
+            _references.move_to_end(message_id)
+            references[message_id] = _references[message_id]
+        else:
+            missing.add(message_id)
+
+    async def fetch(message_id: int) -> None:
+        async with _reference_limit:
+            try:
+                references[message_id] = (await channel.fetch_message(message_id)).clean_content
+            except NotFound:
+                references[message_id] = None
+        _cache_reference(message_id, references[message_id])
+
+    await asyncio.gather(*(fetch(message_id) for message_id in missing))
+    return references
+
+
+async def collect_channels(guild: Guild) -> list[GuildChannel | Thread]:
+    """
+    Returns all text channels of a guild with their active and archived threads.
+    """
+    async def archived_threads(channel: TextChannel) -> list[Thread]:
+        async with _crawl_limit:
+            try:
+                return await channel.archived_threads(limit=None).flatten()
+            except Forbidden:
+                return []
+
+    found: list[GuildChannel | Thread] = list(guild.text_channels)
+    found += await guild.active_threads()
+    for threads in await asyncio.gather(*(archived_threads(channel) for channel in guild.text_channels)):
+        found += threads
+    return found
+
+
+async def messages_by_user_in_guild(guild: Guild, user: User | Member, filename: str, checkpoint: str,
+                                    progress: Callable[[int, int, int], Awaitable[None]]) -> int:
+    """
+    Writes all messages sent by a user in a guild to a file. Returns the number of messages.
+    Channels are crawled concurrently and every finished channel is checkpointed, so an interrupted save resumes.
+    """
+    state: dict = storage.read_json(checkpoint, {"channels": [], "counter": 0, "offset": 0})
+    if not os.path.exists(filename):
+        state = {"channels": [], "counter": 0, "offset": 0}
+    done: set[int] = set(state["channels"])
+
+    todo: list[GuildChannel | Thread] = [channel for channel in await collect_channels(guild) if channel.id not in done]
+    total: int = len(done) + len(todo)
+    budget: attachments.Budget = attachments.Budget(_attachment_budget)
+    lock: asyncio.Lock = asyncio.Lock()
+
+    with open(filename, "r+b" if done else "wb") as file:
+        if done:
+            # whatever was written after the last checkpoint is cut off, its channels are crawled again
+            await asyncio.to_thread(file.truncate, state["offset"])
+            file.seek(state["offset"])
+        else:
+            header: str = f"{user.name}'s messages as of {datetime.datetime.utcnow()}:\n\n"
+            state["offset"] = await asyncio.to_thread(append, file, header)
+
+        async def crawl(channel: GuildChannel | Thread) -> None:
+            async with _crawl_limit:
+                try:
+                    text, counter = await messages_by_user_in_channel(channel, user, budget)
+                except Forbidden:
+                    text, counter = '', 0
+
+            async with lock:
+                state["offset"] = await asyncio.to_thread(append, file, text)
+                state["channels"].append(channel.id)
+                state["counter"] += counter
+                await asyncio.to_thread(storage.write_json, checkpoint, state)
+            await progress(len(state["channels"]), total, state["counter"])
+
+        # a failed crawl stops the others, which would otherwise keep writing to the file and the checkpoint
+        await utils.gather_or_cancel(*(crawl(channel) for channel in todo))
+
+    os.remove(checkpoint)
+    return state["counter"]
+
+
+async def messages_by_user_in_channel(channel: GuildChannel | Thread, user: User | Member,
+                                      budget: attachments.Budget) -> tuple[str, int]:
+    """
+    Returns the messages sent by a user in a channel and their number, and stores their attachments.
+    The next page of the history is already requested while the current one is processed.
+    """
+    found: list[Message] = []
+    page: asyncio.Task = asyncio.create_task(channel.history(limit=100).flatten())
+    try:
+        while True:
+            history: list[Message] = await page
+            if len(history) == 100:
+                page = asyncio.create_task(channel.history(limit=100, before=history[-1]).flatten())
+            for message in history:
+                if message.author == user:
+                    found.append(message)
+            if len(history) < 100:
+                break
+    finally:
+        # the page requested in advance is not needed once the crawl is cancelled
+        page.cancel()
+
+    stored: dict[str, str] = await attachments.store_messages(found, budget)
+    text: list[str] = []
+    for message in found:
+        text.append(f"{message.id}\n{message.created_at}\n")
+        if message.attachments:
+            text.append(f"Attachments: {attachments.describe(message, stored)}\n")
+        text.append(f"{message.clean_content}\n\n\n")
+    return ''.join(text), len(found)
+
+
+def append(file: IO[bytes], text: str) -> int:
     """
-    Returns a list of messages sent by a user in a guild.
+    Appends text to an open file and syncs it to disk. Returns the offset after the text.
     """
-    counter = 0
-    for channel in guild.text_channels:
-        counter += await messages_by_user_in_channel(channel, user)
+    file.write(text.encode("utf8"))
+    file.flush()
+    os.fsync(file.fileno())
+    return file.tell()
 
-    return counter
 
+def write_file(filename: str, text: str, mode: str) -> None:
+    with open(filename, mode, encoding="utf8") as file:
+        file.write(text)
 
-async def messages_by_user_in_channel(channel: GuildChannel | Thread, user: User | Member) -> int:
+
+def read_file(filename: str) -> bytes:
+    with open(filename, "rb") as file:
+        return file.read()
+
+
+async def archived_messages_by_user(guild: Guild, user: User | Member, filename: str) -> int | None:
     """
-    Returns the number of messages sent by a user in a channel.
+    Writes all messages sent by a user to a file from the archive. Returns None if the archive does not cover the guild.
+    What was sent while the bot was offline or the archive was off is crawled first.
+    """
+    if not archive.enabled:
+        return None
+    guild_channels: list[GuildChannel | Thread] = await collect_channels(guild)
+    stale: list[int] | None = await archive.get_stale([channel.id for channel in guild_channels])
+    if stale is None:
+        return None
+
+    async def catch_up(channel: GuildChannel | Thread) -> None:
+        async with _crawl_limit:
+            await archive.backfill_channel(channel)
+
+    try:
+        await utils.gather_or_cancel(*(catch_up(channel) for channel in guild_channels if channel.id in stale))
+    except HTTPException:
+        return None
+
+    messages: list[archive.ArchivedMessage] = await archive.find_messages(guild.id, author_id=user.id)
+    text: str = f"{user.name}'s messages as of {datetime.datetime.utcnow()}:\n\n" + \
+                ''.join(str(message) for message in messages)
+    await asyncio.to_thread(write_file, filename, text, "w")
+    return len(messages)
+
+
+def parse_filters(query: str) -> tuple[datetime.datetime | None, datetime.datetime | None, str | None]:
+    """
+    Splits "after:YYYY-MM-DD before:YYYY-MM-DD keyword" into the date range and the keyword.
+    """
+    after: datetime.datetime | None = None
+    before: datetime.datetime | None = None
+    words: list[str] = []
+    for word in query.split():
+        if word.startswith("after:"):
+            after = datetime.datetime.strptime(word[6:], "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+        elif word.startswith("before:"):
+            before = datetime.datetime.strptime(word[7:], "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+        else:
+            words.append(word)
+    return after, before, ' '.join(words) or None
+
+
+class PurgeFilter:
+    """
+    Selects the messages of a purge by author, content, attachments and time.
     """
-    counter = 0
-    with open(f"{user.name}.txt", "a", encoding="utf8") as file:
-        history = await channel.history(limit=100).flatten()
-        for message in history:
-            if message.author == user:
-                counter += 1
-                file.write(f"{message.id}\n{message.created_at}\n{message.clean_content}\n\n\n")
-        while not len(history) < 100:
-            history = await channel.history(limit=100, before=history[-1]).flatten()
-            for message in history:
-                if message.author == user:
-                    counter += 1
-                    file.write(f"{message.id}\n{message.created_at}\n{message.clean_content}\n\n\n")
 
-    return counter
+    def __init__(self, author_ids: set[int], pattern: re.Pattern | None, attachments: bool,
+                 after: datetime.datetime | None, before: datetime.datetime | None):
+        self.author_ids: set[int] = author_ids
+        self.pattern: re.Pattern | None = pattern
+        self.attachments: bool = attachments
+        self.after: datetime.datetime | None = after
+        self.before: datetime.datetime | None = before
+
+    def matches(self, message: Message) -> bool:
+        return (not self.author_ids or message.author.id in self.author_ids) \
+            and (self.pattern is None or self.pattern.search(message.content) is not None) \
+            and (not self.attachments or len(message.attachments) > 0) \
+            and (self.after is None or message.created_at > self.after) \
+            and (self.before is None or message.created_at < self.before)
+
+    @staticmethod
+    def parse(filters: str) -> "PurgeFilter":
+        """
+        Parses "from:@user attachments after:YYYY-MM-DD before:YYYY-MM-DD regex:pattern", all of them optional.
+        The regex takes the rest of the line, so it may contain spaces.
+        """
+        pattern: re.Pattern | None = None
+        if "regex:" in filters:
+            filters, regex = filters.split("regex:", 1)
+            pattern = re.compile(regex.strip())
+
+        author_ids: set[int] = set()
+        attachments: bool = False
+        rest: list[str] = []
+        for word in filters.split():
+            if word.startswith("from:"):
+                author_ids.add(int(word[5:].strip("<@!>")))
+            elif word == "attachments":
+                attachments = True
+            else:
+                rest.append(word)
+
+        after, before, unknown = parse_filters(' '.join(rest))
+        if unknown is not None:
+            raise ValueError(unknown)
+        return PurgeFilter(author_ids, pattern, attachments, after, before)
 
 
 class Moderation(commands.Cog):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.saves: dict[int, asyncio.Task] = {}
+        self.backfill: asyncio.Task | None = None
+        archive.init_archive()
+        transcripts.init_transcripts()
+        attachments.init_attachments()
+        ledger.init_ledger()
+        self.compact_ledger.start()
+        self.run_expiry.start()
+        router.register(self.qualified_name, self.archive_message)
+
+    def cog_unload(self) -> None:
+        router.unregister(self.qualified_name)
+        self.compact_ledger.cancel()
+        self.run_expiry.cancel()
+
+    @tasks.loop(hours=24)
+    async def compact_ledger(self):
+        ledger.compact()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # a new session may have missed messages, a resumed one replays them and does not get here
+        await archive.mark_stale()
+        await self.assign_archive_guilds()
+
+    async def assign_archive_guilds(self):
+        """
+        Assigns the messages archived before the archive knew their guild to the guild of their channel.
+        """
+        for channel_id in await archive.get_unassigned_channels():
+            try:
+                channel: GuildChannel | Thread | None = self.bot.get_channel(channel_id) or \
+                    await self.bot.fetch_channel(channel_id)
+            except HTTPException:
+                continue
+            if isinstance(channel, GuildChannel | Thread):
+                await archive.assign_guild(channel_id, channel.guild.id)
+
+    @tasks.loop()
+    async def run_expiry(self):
+        """
+        Sleeps until the earliest warning expires, expires every warning that is due in one go and reports them.
+        """
+        warnings.changed.clear()
+        warnings.update_warnings()
+        expired: list[warnings.DiscordWarning] = warnings.take_expired()
+        for warning in expired:
+            ledger.record_warning(ledger.EXPIRE_WARNING, None, warning)
+        if expired:
+            try:
+                await self.report_expired(expired)
+            except Exception as e:
+                logging.exception(f"Reporting expired warnings failed: {e}")
+
+        expires: datetime.datetime | None = warnings.next_expiry()
+        timeout: float | None = None if expires is None else \
+            max((expires - datetime.datetime.utcnow()).total_seconds(), 0)
+        await scheduling.wait(warnings.changed, timeout)
+
+    @run_expiry.before_loop
+    async def before_expiry(self):
+        # the channels are initialized once the bot is ready, the digest is sent to one of them
+        await self.bot.wait_until_ready()
+        await warnings.init_warnings()
+        # the warnings given before the ledger existed are recorded once, so replaying it sees all of them
+        if ledger.is_empty():
+            for warning in warnings.get_all_warnings():
+                ledger.record_warning(ledger.WARN, warning.moderator_id, warning)
+
+    async def report_expired(self, expired: list[warnings.DiscordWarning]) -> None:
+        await warnings.resolve_names(self.bot, {warning.user_id for warning in expired})
+        lines: list[str] = [f"{len(expired)} warnings expired:"]
+        lines += [f"{warnings.get_name(warning.user_id)}: {warning.reason} "
+                  f"(given {warning.given.strftime('%Y-%m-%d %H:%M')})" for warning in expired]
+        for page in utils.paginate(lines):
+            await channels.get_moderation_log().send(page)
+
+    async def archive_message(self, message: Message):
+        if archive.enabled and message.guild is not None:
+            await archive.add_messages([message])
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
+        if archive.enabled and "content" in payload.data:
+            await archive.edit_message(payload.message_id, payload.data["content"])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        if archive.enabled:
+            await archive.delete_messages([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        if archive.enabled:
+            await archive.delete_messages(list(payload.message_ids))
 
     @commands.command(name="save")
     @commands.check(roles.check_is_staff)
@@ -87,92 +429,268 @@ class Moderation(commands.Cog):
             await ctx.send("User not found.")
             return
 
-        with open(f"transcripts/{user.name}.txt", "w", encoding="utf8") as file:
-            file.write(f"{user.name}'s messages as of {datetime.datetime.utcnow()}:\n\n")
+        if user.id in self.saves:
+            await ctx.send(f"{user.name}'s messages are already being saved.")
+            return
+
+        # runs in the background, so the command does not wait for the whole guild to be crawled
+        self.saves[user.id] = asyncio.create_task(self.save_user(ctx, user))
 
-        counter = await messages_by_user_in_guild(ctx.guild, user)
+    async def save_user(self, ctx: commands.Context, user: User | Member) -> None:
+        progress_message: Message = await ctx.send(f"Saving {user.name}'s messages...")
+        last_update: float = asyncio.get_running_loop().time()
 
+        async def progress(done: int, total: int, counter: int) -> None:
+            nonlocal last_update
+            if done < total and asyncio.get_running_loop().time() - last_update < _progress_interval:
+                return
+            last_update = asyncio.get_running_loop().time()
+            await progress_message.edit(content=f"Saving {user.name}'s messages... "
+                                                f"{done}/{total} channels, {counter} messages.")
+
+        try:
+            counter: int | None = await archived_messages_by_user(ctx.guild, user, f"transcripts/{user.name}.txt")
+            if counter is None:
+                counter = await messages_by_user_in_guild(ctx.guild, user, f"transcripts/{user.name}.txt",
+                                                          f"transcripts/{user.id}.checkpoint.json", progress)
+        except Exception as exception:
+            # the save runs as a task nobody awaits, so its errors are reported here or nowhere
+            logging.exception(f"Saving {user.name}'s messages failed")
+            await ctx.send(f"Saving {user.name}'s messages failed, &save resumes it: {exception!r} "
+                           f"{ctx.author.mention}")
+            return
+        finally:
+            del self.saves[user.id]
+
+        ledger.record(ledger.SAVE, ctx.author.id, user.id, messages=counter)
         await ctx.send(f"Saved {counter} messages.")
 
-    @commands.command(name="purge")
+    @commands.command(name="archive", aliases=["Archive"])
     @commands.check(roles.check_is_staff)
-    async def purge_messages(self, ctx: commands.Context, amount: int) -> None:
+    async def archive_messages(self, ctx: commands.Context,
+                               action: Literal["on", "off", "backfill", "status"] = "status") -> None:
         """
-        Purges the amount of messages specified.
+        Turns the local message archive on or off, fills its gaps from the history or shows its state.
         """
-        await ctx.message.delete()
+        if action in ["on", "off"]:
+            archive.set_enabled(action == "on")
+            # the archive misses whatever is sent while it is off
+            await archive.mark_stale()
+            ledger.record(ledger.SETTINGS, ctx.author.id, None, archive=action)
+            await ctx.send(f"The message archive is {action}.")
+            return
 
-        channel: GuildChannel | Thread = ctx.channel
-        counter = 0
-        time = f"{datetime.datetime.utcnow()}"
-        filename = f"transcripts/{int(random.randint(0, 10000000))}.txt"
+        if action == "backfill":
+            if not archive.enabled:
+                await ctx.send("The message archive is off.")
+            elif self.backfill is not None:
+                await ctx.send("The message archive is already being backfilled.")
+            else:
+                self.backfill = asyncio.create_task(self.backfill_archive(ctx))
+            return
 
-        with open(filename, "w", encoding="utf8") as file:
-            file.write(f"{time}:\n\n")
-            async for message in channel.history(limit=amount):
-                counter += 1
-                file.write(await make_message_writeable(message))
+        covered: int = 0
+        stale: int = 0
+        guild_channels: list[GuildChannel | Thread] = ctx.guild.text_channels + ctx.guild.threads
+        for channel in guild_channels:
+            coverage: tuple[int, int, bool, bool] | None = await archive.get_coverage(channel.id)
+            if coverage is not None and coverage[2]:
+                covered += 1
+                stale += not coverage[3]
+        await ctx.send(f"The message archive is {'on' if archive.enabled else 'off'}, "
+                       f"{covered}/{len(guild_channels)} channels are archived back to their first message, "
+                       f"{stale} of them miss messages sent while the bot was offline or the archive was off.")
+
+    async def backfill_archive(self, ctx: commands.Context) -> None:
+        """
+        Archives the parts of every channel's history the archive does not cover yet.
+        """
+        async def crawl(channel: GuildChannel | Thread) -> int:
+            async with _crawl_limit:
+                try:
+                    return await archive.backfill_channel(channel)
+                except Forbidden:
+                    return 0
 
-        await channel.purge(limit=counter)
-        await channels.get_bot_log().send(f"Purged {counter} messages from {ctx.channel.name}.", file=File(filename))
-        os.remove(filename)
+        try:
+            counts: list[int] = await asyncio.gather(*(crawl(channel)
+                                                       for channel in await collect_channels(ctx.guild)))
+        finally:
+            self.backfill = None
+        await ctx.send(f"Archived {sum(counts)} messages.")
 
-    @commands.command(name="purgeAfter", aliases=["purgeafter"])
+    @commands.command(name="find", aliases=["Find"])
     @commands.check(roles.check_is_staff)
-    async def purge_after(self, ctx: commands.Context) -> None:
+    async def find_messages(self, ctx: commands.Context, user: User | Member,
+                            channel: TextChannel | Thread | None = None, *, query: str = "") -> None:
         """
-        Purges all messages after the referenced message.
+        Finds archived messages of a user, optionally in a channel and with "after:YYYY-MM-DD", "before:YYYY-MM-DD"
+        and a keyword.
         """
-        await ctx.message.delete()
+        if not archive.enabled:
+            await ctx.send("The message archive is off.")
+            return
+
+        try:
+            after, before, keyword = parse_filters(query)
+        except ValueError:
+            await ctx.send(f"Dates have to look like after:2022-05-01 {ctx.author.mention}\r\n"
+                           f"```{ctx.message.clean_content}```")
+            return
+
+        messages: list[archive.ArchivedMessage] = await archive.find_messages(
+            ctx.guild.id, user.id, None if channel is None else channel.id, after, before, keyword)
+        if not messages:
+            await ctx.send(f"No archived messages of {user.name} found.")
+            return
+
+        def channel_name(channel_id: int) -> str:
+            found: GuildChannel | Thread | None = ctx.guild.get_channel_or_thread(channel_id)
+            return str(channel_id) if found is None else found.name
+
+        text: str = ''.join(f"#{channel_name(message.channel_id)} {message}" for message in messages)
+        await ctx.send(f"Found {len(messages)} messages of {user.name}.",
+                       file=File(io.BytesIO(text.encode("utf8")), f"{user.name}.txt"))
 
+    async def purge_history(self, ctx: commands.Context, history: list[Message], purge_filter: PurgeFilter,
+                            references: list[Message]) -> None:
+        """
+        Transcribes and deletes the messages of a history that match the filter, in a single pass over the history.
+        """
         channel: GuildChannel | Thread = ctx.channel
-        reference: Message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        counter = 0
-        time = f"{datetime.datetime.utcnow()}"
-        filename = f"transcripts/{int(random.randint(0, 10000000))}.txt"
+        messages: list[Message] = [message for message in history if purge_filter.matches(message)]
+        time: datetime.datetime = datetime.datetime.utcnow()
+
+        # the attachments have to be stored before their messages are deleted
+        resolved, stored = await asyncio.gather(
+            resolve_references(channel, messages, history + references),
+            attachments.store_messages(messages, attachments.Budget(_attachment_budget)))
+        # the entries are rendered here and only encoded in the thread, a chunk at a time so neither holds all of them
+        writer: transcripts.TranscriptWriter = transcripts.TranscriptWriter()
+        chunk: list[str] = [f"{time}:\n\n"]
+        for message in messages:
+            chunk.append(make_message_writeable(message, resolved, stored))
+            if len(chunk) >= _transcript_chunk:
+                await asyncio.to_thread(writer.write, ''.join(chunk))
+                chunk = []
+        await asyncio.to_thread(writer.write, ''.join(chunk))
+        buffer: IO[bytes] = await asyncio.to_thread(writer.finish)
+
+        await utils.delete_messages(channel, [message.id for message in messages])
+        # the id of the command tells apart purges of the same channel within the same second
+        name: str = transcripts.filename(f"purge-{channel.id}-{time:%Y%m%d-%H%M%S}-{ctx.message.id}")
+        authors: dict[int, int] = {}
+        for message in messages:
+            authors[message.author.id] = authors.get(message.author.id, 0) + 1
+        for author_id, counter in authors.items():
+            ledger.record(ledger.PURGE, ctx.author.id, author_id, channel=channel.name, messages=counter,
+                          transcript=name)
+        with buffer:
+            parts: list[tuple[str, io.BytesIO]] = list(transcripts.split(buffer, name, ctx.guild.filesize_limit))
+            for number, (part_name, data) in enumerate(parts, 1):
+                await channels.get_bot_log().send(
+                    f"Purged {len(messages)} messages from {ctx.channel.name}."
+                    if number == 1 else f"Part {number}/{len(parts)} of {name}.", file=File(data, part_name))
+            await asyncio.to_thread(transcripts.keep, buffer, channel.id, name, time)
+
+    async def parse_purge_filter(self, ctx: commands.Context, filters: str) -> PurgeFilter | None:
+        try:
+            return PurgeFilter.parse(filters)
+        except (ValueError, re.error):
+            await ctx.send(f"Filters have to look like from:@user attachments after:2022-05-01 before:2022-06-01 "
+                           f"regex:pattern {ctx.author.mention}\r\n```{ctx.message.clean_content}```")
+            return None
 
-        with open(filename, "w", encoding="utf8") as file:
-            file.write(f"{time}:\n\n")
+    @commands.command(name="purge")
+    @commands.check(roles.check_is_staff)
+    async def purge_messages(self, ctx: commands.Context, amount: int, *, filters: str = "") -> None:
+        """
+        Purges the amount of messages specified, or the ones among them that match the filters.
+        """
+        await ctx.message.delete()
+        purge_filter: PurgeFilter | None = await self.parse_purge_filter(ctx, filters)
+        if purge_filter is None:
+            return
 
-            history = await channel.history(limit=100, after=reference).flatten()
-            for message in history:
-                counter += 1
-                file.write(await make_message_writeable(message))
+        # history defaults to the oldest messages first once after is given, a purge takes the latest ones
+        history: list[Message] = await ctx.channel.history(limit=amount, before=purge_filter.before,
+                                                           after=purge_filter.after, oldest_first=False).flatten()
+        await self.purge_history(ctx, history, purge_filter, [])
 
-            while not len(history) < 100:
-                history = await channel.history(limit=100, before=history[-1], after=reference).flatten()
-                for message in history:
-                    counter += 1
-                    file.write(await make_message_writeable(message))
+    @commands.command(name="purgeAfter", aliases=["purgeafter"])
+    @commands.check(roles.check_is_staff)
+    async def purge_after(self, ctx: commands.Context, *, filters: str = "") -> None:
+        """
+        Purges all messages after the referenced message, or the ones that match the filters.
+        """
+        await ctx.message.delete()
+        purge_filter: PurgeFilter | None = await self.parse_purge_filter(ctx, filters)
+        if purge_filter is None:
+            return
 
-        await channel.purge(limit=counter, after=reference)
-        await channels.get_bot_log().send(f"Purged {counter} messages from {ctx.channel.name}.", file=File(filename))
-        os.remove(filename)
+        reference: Message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
+        history: list[Message] = await ctx.channel.history(limit=None, after=reference).flatten()
+        await self.purge_history(ctx, history, purge_filter, [reference])
 
     @commands.command(name="purgeBefore", aliases=["purgebefore"])
     @commands.check(roles.check_is_staff)
-    async def purge_before(self, ctx: commands.Context, amount: int) -> None:
+    async def purge_before(self, ctx: commands.Context, amount: int, *, filters: str = "") -> None:
         """
-        Purges the amount of messages specified before the referenced message.
+        Purges the amount of messages specified before the referenced message, or the ones among them that match the
+        filters.
         """
         await ctx.message.delete()
+        purge_filter: PurgeFilter | None = await self.parse_purge_filter(ctx, filters)
+        if purge_filter is None:
+            return
 
-        channel: GuildChannel | Thread = ctx.channel
         reference: Message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        counter = 0
-        time = f"{datetime.datetime.utcnow()}"
-        filename = f"transcripts/{int(random.randint(0, 10000000))}.txt"
+        history: list[Message] = await ctx.channel.history(limit=amount, before=reference).flatten()
+        await self.purge_history(ctx, history, purge_filter, [reference])
 
-        with open(filename, "w", encoding="utf8") as file:
-            file.write(f"{time}:\n\n")
+    @commands.command(name="transcriptSettings", aliases=["transcriptsettings"])
+    @commands.check(roles.check_is_staff)
+    async def transcript_settings(self, ctx: commands.Context, compress: bool, keep_days: int) -> None:
+        """
+        Sets whether purge transcripts are gzip compressed and how many days they are kept locally, 0 keeps none.
+        """
+        transcripts.set_settings(compress, max(keep_days, 0))
+        ledger.record(ledger.SETTINGS, ctx.author.id, None, compress=compress, keep_days=max(keep_days, 0))
+        await ctx.send(f"Purge transcripts are {'' if compress else 'not '}compressed "
+                       f"and kept for {max(keep_days, 0)} days.")
 
-            async for message in channel.history(limit=amount, before=reference):
-                counter += 1
-                file.write(await make_message_writeable(message))
+    @commands.command(name="transcripts", aliases=["Transcripts"])
+    @commands.check(roles.check_is_staff)
+    async def kept_transcripts(self, ctx: commands.Context, channel: TextChannel | Thread, date: str) -> None:
+        """
+        Sends the kept purge transcripts of a channel from a date (YYYY-MM-DD).
+        """
+        paths: list[str] = transcripts.find_kept(channel.id, date)
+        if not paths:
+            await ctx.send(f"No transcripts of {channel.name} kept from {date}.")
+            return
 
-        await channel.purge(limit=counter, before=reference)
-        await channels.get_bot_log().send(f"Purged {counter} messages from {ctx.channel.name}.", file=File(filename))
-        os.remove(filename)
+        for path in paths:
+            kept: io.BytesIO = io.BytesIO(await asyncio.to_thread(read_file, path))
+            for part_name, data in transcripts.split(kept, os.path.basename(path), ctx.guild.filesize_limit):
+                await ctx.send(file=File(data, part_name))
+
+    @commands.command(name="attachment", aliases=["Attachment"])
+    @commands.check(roles.check_is_staff)
+    async def find_attachment(self, ctx: commands.Context, digest: str) -> None:
+        """
+        Sends a stored attachment of a purged or saved message by its hash, or a unique start of it.
+        """
+        found: tuple[str, str, str] | None = attachments.find(digest)
+        if found is None:
+            await ctx.send(f"No single stored attachment matches \"{digest}\".")
+            return
+
+        digest, filename, path = found
+        if os.path.getsize(path) > ctx.guild.filesize_limit:
+            await ctx.send(f"{filename} (sha256:{digest}) is too large to upload, it is stored at {path}.")
+            return
+        await ctx.send(f"sha256:{digest}", file=File(io.BytesIO(await asyncio.to_thread(read_file, path)), filename))
 
     @commands.command(name="warn")
     @commands.check(roles.check_is_staff)
@@ -183,9 +701,11 @@ class Moderation(commands.Cog):
         await ctx.message.delete()
 
         given: datetime.datetime = datetime.datetime.utcnow()
-        expires: datetime.datetime = warnings.generate_expiration(user)
-        warning: warnings.DiscordWarning = warnings.DiscordWarning(user, reason, ctx.author, given, expires)
-        warning_amount: int = warnings.add_warning(warning)
+        expires: datetime.datetime = warnings.generate_expiration(user.id)
+        warnings.set_name(user.id, user.name)
+        warning: warnings.DiscordWarning = warnings.DiscordWarning(user.id, reason, ctx.author.id, given, expires)
+        warning_amount: int = await warnings.add_warning(warning)
+        ledger.record_warning(ledger.WARN, ctx.author.id, warning)
 
         await user.send(f"You have been warned in {ctx.guild.name} for: "
                         f"\n{reason}")
@@ -206,57 +726,113 @@ class Moderation(commands.Cog):
             await ctx.send(f"Warning with ID \"{id}\" not found.")
             return
 
-        if warning.user == ctx.author:
+        if warning.user_id == ctx.author.id:
             await ctx.send("You cannot delete your own warning.")
             return
 
-        warnings.delete_warning(warning)
+        await warnings.delete_warning(warning)
+        ledger.record_warning(ledger.DELETE_WARNING, ctx.author.id, warning)
         await ctx.send("Warning deleted.")
 
-    @commands.command(name="warnings")
-    @commands.check(roles.check_is_staff)
-    async def warnings(self, ctx: commands.Context, user: User | Member) -> None:
+    async def send_warnings(self, ctx: commands.Context, title: str, page: int | None, filters: str = "",
+                            user_id: int | None = None) -> None:
         """
-        Returns all warnings for a user
+        Sends a page of warnings. The filters are "by:@moderator" and "within:<days>d" for warnings expiring soon.
         """
-        user_warnings = warnings.get_warnings_by_user(user)
+        moderator_id: int | None = None
+        expires_within: datetime.timedelta | None = None
+        try:
+            for word in filters.split():
+                if word.startswith("by:"):
+                    moderator_id = int(word[3:].strip("<@!>"))
+                elif word.startswith("within:"):
+                    expires_within = datetime.timedelta(days=float(word[7:].rstrip("d")))
+                else:
+                    raise ValueError(word)
+        except ValueError:
+            await ctx.send(f"Filters have to look like by:@moderator within:7d {ctx.author.mention}\r\n"
+                           f"```{ctx.message.clean_content}```")
+            return
 
-        if not user_warnings:
-            await ctx.send(f"{user.name} has no warnings.")
+        # a page that is left out, or a filter in its place, means the first page
+        page = max(page or 1, 1)
+        page_warnings, total = warnings.get_page(page, _warnings_per_page, user_id, moderator_id, expires_within)
+        if total == 0:
+            await ctx.send(f"{title}: no warnings.")
+            return
+        pages: int = (total + _warnings_per_page - 1) // _warnings_per_page
+        if not page_warnings:
+            await ctx.send(f"{title}: there are only {pages} pages.")
             return
 
-        warnings_message: str = f"{user.name} has {len(user_warnings)} warnings:"
-        for warning in user_warnings:
-            warnings_message += f"\n{warning}" \
-                                f"\n**--------------------------------------------------**"
+        await warnings.resolve_names(self.bot, {warning.user_id for warning in page_warnings})
+        lines: list[str] = [f"{title}: {total} warnings, page {page}/{pages}:"]
+        lines += [f"{warning}\n**--------------------------------------------------**" for warning in page_warnings]
 
-        await ctx.send(warnings_message)
+        # long reasons spill over into further messages instead of being cut off
+        for message in utils.paginate(lines):
+            await ctx.send(message)
 
-    @commands.command(name="allWarnings", aliases=["allwarnings"])
+    @commands.command(name="warnings")
     @commands.check(roles.check_is_staff)
-    async def all_warnings(self, ctx: commands.Context) -> None:
+    async def warnings(self, ctx: commands.Context, user: User | Member, page: int | None = None, *,
+                       filters: str = "") -> None:
         """
-        Returns all warnings.
+        Returns a page of the warnings for a user
         """
-        warnings_message: str = "All warnings:"
-        for warning in warnings.get_all_warnings():
-            warnings_message += f"\n{warning}" \
-                                f"\n**--------------------------------------------------**"
+        warnings.set_name(user.id, user.name)
+        await self.send_warnings(ctx, user.name, page, filters, user.id)
 
-        await ctx.send(warnings_message)
+    @commands.command(name="allWarnings", aliases=["allwarnings"])
+    @commands.check(roles.check_is_staff)
+    async def all_warnings(self, ctx: commands.Context, page: int | None = None, *, filters: str = "") -> None:
+        """
+        Returns a page of all warnings.
+        """
+        await self.send_warnings(ctx, "All warnings", page, filters)
 
     @commands.command(name="myWarnings", aliases=["mywarnings"])
-    async def my_warnings(self, ctx: commands.Context) -> None:
+    async def my_warnings(self, ctx: commands.Context, page: int | None = None) -> None:
         """
-        Returns all warnings for the user.
+        Returns a page of the warnings for the user.
         """
-        user_warnings = warnings.get_warnings_by_user(ctx.author)
+        warnings.set_name(ctx.author.id, ctx.author.name)
+        await self.send_warnings(ctx, ctx.author.name, page, user_id=ctx.author.id)
 
-        if not user_warnings:
-            await ctx.reply(f"{ctx.author.name} has no warnings.")
+    @commands.command(name="modlog", aliases=["modLog"])
+    @commands.check(roles.check_is_staff)
+    async def modlog(self, ctx: commands.Context, user: User | Member, page: int = 1) -> None:
+        """
+        Returns a page of the moderation actions taken against a user, newest first.
+        """
+        entries: list[ledger.LedgerEntry] = ledger.get_by_target(user.id)
+        if not entries:
+            await ctx.send(f"No moderation actions against {user.name} recorded.")
             return
 
-        warnings_message: str = f"{ctx.author.name} has {len(user_warnings)} warnings:"
-        for warning in user_warnings:
-            warnings_message += f"\n{warning}" \
-                                f"\n**--------------------------------------------------**"
+        pages: int = (len(entries) + _modlog_per_page - 1) // _modlog_per_page
+        page = min(max(page, 1), pages)
+        end: int = len(entries) - (page - 1) * _modlog_per_page
+        page_entries: list[ledger.LedgerEntry] = entries[max(end - _modlog_per_page, 0):end][::-1]
+        await warnings.resolve_names(self.bot, {entry.moderator_id for entry in page_entries
+                                                if entry.moderator_id is not None})
+
+        lines: list[str] = [f"{user.name}: {len(entries)} moderation actions, page {page}/{pages}:"]
+        lines += [str(entry) for entry in page_entries]
+        for message in utils.paginate(lines):
+            await ctx.send(message)
+
+    @commands.command(name="replayWarnings", aliases=["replaywarnings"])
+    @commands.check(roles.check_is_staff)
+    async def replay_warnings(self, ctx: commands.Context) -> None:
+        """
+        Rebuilds the warnings from the moderation ledger, restoring the ones missing from the warnings store.
+        """
+        replayed: list[warnings.DiscordWarning] = ledger.replay_warnings()
+        current: set[uuid.UUID] = {warning.id for warning in warnings.get_all_warnings()}
+        missing: list[warnings.DiscordWarning] = [warning for warning in replayed if warning.id not in current]
+        for warning in missing:
+            await warnings.add_warning(warning)
+
+        unknown: int = len(current - {warning.id for warning in replayed})
+        await ctx.send(f"Restored {len(missing)} warnings from the ledger, {unknown} warnings are not in it.")
@@ -1,11 +1,17 @@
-from disnake import Message
-from disnake.ext import commands
+import asyncio
+import logging
+from typing import Literal, Callable
+
+from disnake import Message, Member, Emoji, NotFound, Forbidden, RawMessageUpdateEvent, RawMessageDeleteEvent, \
+    RawBulkMessageDeleteEvent, RawReactionActionEvent, RawReactionClearEvent, RawReactionClearEmojiEvent
+from disnake.ext import commands, tasks
 from disnake.ext.commands import MessageNotFound
 
+import bill_parser
+import scheduling
 import utils
-from vars import channels, roles, emojis, index
-
-_history_limit: int = 100
+from vars import channels, roles, emojis, index, bills, tallies, audits, conclusions, search, deadlines, bill_history, \
+    senate_stats
 
 
 def setup(bot: commands.Bot) -> None:
@@ -33,71 +39,93 @@ def check_senatorial_channels(ctx: commands.Context) -> bool:
     return ctx.message.channel in allowed_channels
 
 
-async def find_bill(bot: commands.Bot, bill_number: int, history: list[Message] | None = None) -> Message | None:
-    if history is None:
-        history = await channels.get_senatorial_voting().history(limit=_history_limit).flatten()
+async def find_bill(bot: commands.Bot, bill_number: int) -> Message:
+    found: dict[int, Message] = await find_bills(bot, [bill_number])
+    if bill_number not in found:
+        raise MessageNotFound(str(bill_number))
+    return found[bill_number]
+
 
-    for msg in history:  # TODO make this not depend on precise spacing.
+async def find_bills(bot: commands.Bot, bill_numbers: list[int]) -> dict[int, Message]:
+    """
+    Looks up several bills at once. Bills that could not be found are missing from the result.
+    """
+    async def fetch(record: bills.BillRecord) -> Message | None:
+        # uncached threads are not returned by get_channel, a deleted channel makes the record stale
+        channel = bot.get_channel(record.channel_id)
+        try:
+            if channel is None:
+                channel = await bot.fetch_channel(record.channel_id)
+            return await channel.fetch_message(record.message_id)
+        except NotFound:
+            bills.remove_message(record.message_id)
+            return None
+        except Forbidden:
+            return None
+
+    records: list[bills.BillRecord] = [record for record in map(bills.get_bill, set(bill_numbers))
+                                       if record is not None]
+    messages: list[Message | None] = await asyncio.gather(*(fetch(record) for record in records))
+    found: dict[int, Message] = {record.number: msg for record, msg in zip(records, messages) if msg is not None}
+
+    # the registry knows every bill once it has been backfilled
+    unregistered: set[int] = set(bill_numbers) - {record.number for record in records}
+    if unregistered and not bills.is_backfilled():
+        found.update(await crawl_bills(unregistered))
+    return found
+
+
+async def crawl_bills(bill_numbers: set[int]) -> dict[int, Message]:
+    """
+    Searches the #senatorial-voting history for bills, in a single pass for all of them.
+    """
+    found: dict[int, Message] = {}
+    async for msg in channels.get_senatorial_voting().history(limit=None):
         if utils.is_me(msg):
             continue
-        if roles.senator not in msg.role_mentions:
-            continue
-
-        content: list[str] = msg.content.split(' ')
-        if len(content) <= 1:
+        parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(msg)
+        if parsed is None or parsed.number not in bill_numbers or parsed.number in found:
             continue
-        if to_int(content[1]) != bill_number:
+        if not parsed.mentions(roles.senator):
             continue
-        return msg
-
-    if len(history) == _history_limit:
-        last: Message = history[_history_limit - 1]
-        history = await channels.get_senatorial_voting().history(limit=_history_limit, before=last).flatten()
-        return await find_bill(bot, bill_number, history)
-
-    raise MessageNotFound
-
-
-def count_votes(bill: Message) -> str:
-    yes, no = -1, -1
-    one, two, three, four, five, six = -1, -1, -1, -1, -1, -1
-    abstain: int = -1
-    for reaction in bill.reactions:
-        match reaction.emoji:
-            case emojis.yes_vote:
-                yes += reaction.count
-            case emojis.no_vote:
-                no += reaction.count
-            case emojis.one:
-                one += reaction.count
-            case emojis.two:
-                two += reaction.count
-            case emojis.three:
-                three += reaction.count
-            case emojis.four:
-                four += reaction.count
-            case emojis.five:
-                five += reaction.count
-            case emojis.six:
-                six += reaction.count
-            case emojis.abstain_vote:
-                abstain += reaction.count
-
-    vote_string: str = f"\r\n"
-    if yes >= 0:
-        vote_string += f"{yes} {emojis.yes_vote}"
-    if one >= 0 and two >= 0:
-        vote_string += f"{one} {emojis.one} | {two} {emojis.two}"
-    if three >= 0:
-        vote_string += f" | {three} {emojis.three}"
-    if four >= 0:
-        vote_string += f" | {four} {emojis.four}"
-    if five >= 0:
-        vote_string += f" | {five} {emojis.five}"
-    if six >= 0:
-        vote_string += f" | {six} {emojis.six}"
-    vote_string += f" | {no} {emojis.no_vote} | {abstain} {emojis.abstain_vote}"
-    return vote_string
+        bills.register_message(msg)
+        found[parsed.number] = msg
+        if len(found) == len(bill_numbers):
+            break
+    return found
+
+
+def vote_target(payload: RawReactionActionEvent) -> tuple[int, str] | None:
+    """
+    Returns the bill number and vote of a reaction, None if it is no vote on a bill.
+    """
+    record: bills.BillRecord | None = bills.get_bill_by_message(payload.message_id)
+    if record is None:
+        return None
+    key: str | None = tallies.vote_key(payload.emoji)
+    if key is None:
+        return None
+    return record.number, key
+
+
+async def count_votes(bot: commands.Bot, bill_number: int, bill: Message, audited: bool = False) -> str:
+    if audited:
+        audit: audits.Audit = await audits.audit(bill_number, bill, bot.user.id)
+        return f"{tallies.format_votes(audit.tally)}\r\n{audit}"
+
+    if not tallies.has_tally(bill_number):
+        tallies.reconcile(bill_number, bill)
+    return tallies.format_tally(bill_number)
+
+
+def remove_message(message_id: int) -> None:
+    """
+    Forgets a deleted bill message everywhere it is kept track of.
+    """
+    record: bills.BillRecord | None = bills.get_bill_by_message(message_id)
+    if record is not None:
+        search.remove_bill(record.number)
+    bills.remove_message(message_id)
 
 
 def assemble_bill(text: str, bill_index: int, author: str) -> str:
@@ -116,22 +144,325 @@ def assemble_amendment(text: str, bill_index: int, bill_number: int, author: str
     return text
 
 
-# removes everything but numbers from a string and converts it to an integer
-def to_int(string: str) -> int | None:
-    number = ''
-    for c in string:
-        if c.isdigit():
-            number += c
+def track_bill(msg: Message, bill_number: int, author_id: int, text: str, votes: list[str],
+               kind: str = bills.KIND_BILL, parent: int | None = None) -> None:
+    """
+    Records a freshly posted bill everywhere it is kept track of.
+    """
+    bills.register_bill(msg, bill_number, author_id, kind, parent)
+    search.index_bill(bill_number, text)
+    bill_history.add_version(bill_number, text)
+    tallies.open_tally(bill_number, votes)
+    senate_stats.record_proposal(author_id, msg.id)
+
+
+def render_bill_tree(bill_number: int, depth: int = 0, visited: set[int] | None = None) -> list[str]:
+    """
+    Renders a bill and all its amendments, one line per bill, from the registry and the tallies.
+    """
+    visited = set() if visited is None else visited
+    visited.add(bill_number)
+
+    record: bills.BillRecord | None = bills.get_bill(bill_number)
+    tally: dict[str, int] | None = tallies.get_tally(bill_number)
+    line: str = f"{'    ' * depth}{'└ ' if depth > 0 else ''}**Bill {bill_number}** " \
+                f"({'unknown' if record is None else record.status})"
+    if tally:
+        line += f" {tallies.format_votes(tally).strip()}"
+    lines: list[str] = [line]
+
+    for amendment in bills.get_amendments(bill_number):
+        if amendment.number not in visited:
+            lines += render_bill_tree(amendment.number, depth + 1, visited)
+    return lines
+
+
+def bill_author(bill: Message) -> str:
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(bill)
+    return '' if parsed is None or parsed.author is None else parsed.author
+
+
+class Conclusion:
+    """
+    The way a conclusion command marks a bill.
+    """
+
+    def __init__(self, action: str, status: str, announcement: str, emoji: Callable[[], Emoji | str],
+                 unmark: bool = False):
+        self.action: str = action
+        self.status: str = status
+        self.announcement: str = announcement
+        self.emoji: Callable[[], Emoji | str] = emoji
+        self.unmark: bool = unmark
+
+
+# bill number -> lock held while a bill is checked and concluded, so no bill is concluded twice at the same time
+_concluding: dict[int, asyncio.Lock] = {}
+# emojis are only initialized once the bot is ready, so they are looked up when needed
+_conclusions: dict[str, Conclusion] = {
+    "pass": Conclusion("pass", bills.STATUS_PASSED, "passes", lambda: emojis.bill_closed),
+    "fail": Conclusion("fail", bills.STATUS_FAILED, "does not pass", lambda: emojis.bill_closed),
+    "veto": Conclusion("veto", bills.STATUS_VETOED, "is vetoed", lambda: emojis.imperial_authority),
+    "forcethrough": Conclusion("forcethrough", bills.STATUS_FORCED, "is forced through",
+                               lambda: emojis.imperial_mandate),
+    "void": Conclusion("void", bills.STATUS_VOID, "is void", lambda: emojis.void),
+    "unvoid": Conclusion("unvoid", bills.STATUS_OPEN, "is unvoided", lambda: emojis.void, unmark=True),
+    "withdraw": Conclusion("withdraw", bills.STATUS_WITHDRAWN, "is withdrawn", lambda: emojis.withdrawn)
+}
+
+
+async def check_conclusion(conclusion: Conclusion, ctx: commands.Context, bill: Message) -> str | None:
+    """
+    Returns why a bill cannot be concluded, None if it can.
+    """
+    if conclusion.unmark:
+        if not any(reaction.emoji == conclusion.emoji() and reaction.me for reaction in bill.reactions):
+            return "Bill isn't void."
+        return None
+
+    if await check_bill_concluded(bill):
+        return "Bill has already been concluded."
+    return check_initiator(conclusion, ctx, bill)
+
+
+def check_initiator(conclusion: Conclusion, ctx: commands.Context, bill: Message) -> str | None:
+    """
+    Returns why the author of the command may not conclude a bill, None if they may.
+    Also checked when an unfinished conclusion is resumed.
+    """
+    if conclusion.action == "withdraw":
+        parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(bill)
+        if parsed is None or parsed.author_id != ctx.author.id:
+            return "This is not your Bill."
+    return None
+
+
+def conclusion_lock(bill_number: int) -> asyncio.Lock:
+    return _concluding.setdefault(bill_number, asyncio.Lock())
+
+
+async def run_conclusion(bot: commands.Bot, conclusion: Conclusion, bill_number: int, bill: Message, entry: dict,
+                         audited: bool = False) -> None:
+    """
+    Runs the steps of a conclusion that are not journaled as done yet, all at the same time.
+    """
+    # the incremental tally misses votes cast while the bot was offline and those not flushed before a crash,
+    # what is posted and recorded is counted from the freshly fetched reactions instead
+    tallies.reconcile(bill_number, bill)
+
+    async def mark() -> None:
+        if conclusion.unmark:
+            await bill.remove_reaction(conclusion.emoji(), bot.user)
+        else:
+            await bill.add_reaction(conclusion.emoji())
+
+    async def reply() -> None:
+        await bill.reply(f"Bill {bill_number} {conclusion.announcement}."
+                         f"\r\n{entry['comment']}{bill_author(bill)}")
+
+    async def archive() -> None:
+        parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(bill)
+        wording: str = bill.content if parsed is None else f"{parsed.wording()} "
+        wording += await count_votes(bot, bill_number, bill, audited)
+        await channels.get_passed_bills().send(wording)
+
+    steps: dict[str, Callable] = {"mark": mark, "reply": reply}
+    if conclusion.action == "pass":
+        steps["archive"] = archive
+
+    pending: list[str] = [step for step in steps if step not in entry["done"]]
+    results: list = await asyncio.gather(*(steps[step]() for step in pending), return_exceptions=True)
+    await conclusions.mark_done(bill_number, conclusion.action, [step for step, result in zip(pending, results)
+                                                                 if not isinstance(result, BaseException)])
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    record: bills.BillRecord | None = bills.get_bill(bill_number)
+    tally: dict[str, int] | None = tallies.get_tally(bill_number)
+    senate_stats.record_conclusion(None if record is None else record.author_id, bill.id,
+                                   bills.STATUS_VOID if conclusion.unmark else conclusion.status,
+                                   None if not tally else sum(tally.values()), -1 if conclusion.unmark else 1)
+
+    bills.set_status(bill_number, conclusion.status)
+    await conclusions.finish(bill_number, conclusion.action)
+
+
+async def conclude(bot: commands.Bot, ctx: commands.Context, conclusion: Conclusion, bill_numbers: list[int],
+                   comment: str, audited: bool = False) -> None:
+    """
+    Concludes the given bills. Unfinished conclusions are picked up where they stopped.
+    """
+    # variable set up
+    author: str = ctx.author.mention
+    if comment != '':
+        comment += ' '
+
+    # check that bill_number is valid, a bill given twice is concluded once
+    valid: list[int] = list(dict.fromkeys(bill_number for bill_number in bill_numbers
+                                          if 0 < bill_number <= index.get_index()))
+    if not valid or len(valid) != len(set(bill_numbers)):
+        await ctx.message.delete()
+        await ctx.message.channel.send(f"No valid bill number was given. {author}"
+                                       f"\r\n```{ctx.message.clean_content}```")
+        return
+
+    _, found = await asyncio.gather(ctx.message.delete(), find_bills(bot, valid))
+
+    for bill_number in valid:
+        bill: Message | None = found.get(bill_number)
+        if bill is None:
+            await ctx.channel.send(f"No bill {bill_number} found. {author}"
+                                   f"\r\n```{ctx.message.clean_content}```")
+            continue
+
+        # a failing bill does not hold up the others, its journal entry lets it be retried later
+        try:
+            error: str | None = await conclude_bill(bot, ctx, conclusion, bill_number, bill, comment, audited)
+        except Exception as exception:
+            logging.exception(f"Concluding bill {bill_number} failed")
+            error = f"could not be concluded: {exception!r}"
+        if error is not None:
+            await ctx.channel.send(f"Bill {bill_number}: {error} {author}"
+                                   f"\r\n```{ctx.message.clean_content}```")
+
 
-    if number == '':
+async def conclude_bill(bot: commands.Bot, ctx: commands.Context, conclusion: Conclusion, bill_number: int,
+                        bill: Message, comment: str, audited: bool) -> str | None:
+    """
+    Checks and concludes a single bill, or resumes its unfinished conclusion. Returns why it was not concluded.
+    """
+    async with conclusion_lock(bill_number):
+        # another conclusion may have finished since the bill was fetched, which its reactions would not show yet
+        bill = await bill.channel.fetch_message(bill.id)
+
+        entry: dict | None = conclusions.get_entry(bill_number, conclusion.action)
+        error: str | None = await check_conclusion(conclusion, ctx, bill) if entry is None \
+            else check_initiator(conclusion, ctx, bill)
+        if error is not None:
+            return error
+        if entry is None:
+            entry = await conclusions.start(bill_number, conclusion.action, comment)
+        await run_conclusion(bot, conclusion, bill_number, bill, entry, audited)
         return None
-    return int(number)
 
 
 class Senate(commands.Cog):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        bills.init_bills()
+        senate_stats.init_stats()
+        search.init_search()
+        tallies.init_tallies()
+        conclusions.init_conclusions()
+        deadlines.init_deadlines()
+        self.write_indexes.start()
+        self.run_deadlines.start()
+
+    def cog_unload(self) -> None:
+        self.write_indexes.cancel()
+        self.run_deadlines.cancel()
+        tallies.write_tallies()
+        search.write_search()
+        bills.write_bills()
+        senate_stats.write_stats()
+
+    @tasks.loop(seconds=30)
+    async def write_indexes(self):
+        tallies.write_tallies()
+        search.write_search()
+        bills.write_bills()
+        senate_stats.write_stats()
+
+    @tasks.loop()
+    async def run_deadlines(self):
+        """
+        Sleeps until the earliest deadline and handles every deadline that is due in one go.
+        """
+        deadlines.changed.clear()
+        due: float | None = deadlines.next_due()
+        if due is None or due > deadlines.now():
+            await scheduling.wait(deadlines.changed, None if due is None else due - deadlines.now())
+            return
+
+        for bill_number, action in await deadlines.pop_due(deadlines.now()):
+            try:
+                await self.end_voting(bill_number, action)
+            except Exception as e:
+                logging.exception(f"Deadline of bill {bill_number} failed: {e}")
+
+    @run_deadlines.before_loop
+    async def before_deadlines(self):
+        # deadlines fetch their bills, which needs the guild
+        await self.bot.wait_until_ready()
+
+    async def end_voting(self, bill_number: int, action: str):
+        record: bills.BillRecord | None = bills.get_bill(bill_number)
+        if record is None or not record.is_open():
+            return
+
+        bill: Message = await find_bill(self.bot, bill_number)
+        if action == deadlines.ACTION_FAIL:
+            async with conclusion_lock(bill_number):
+                # a conclusion command may have run while the bill was fetched
+                bill = await bill.channel.fetch_message(bill.id)
+                if await check_bill_concluded(bill):
+                    return
+                entry: dict = await conclusions.start(bill_number, "fail", "The voting deadline has passed. ")
+                await run_conclusion(self.bot, _conclusions["fail"], bill_number, bill, entry)
+            return
+
+        await channels.get_senate().send(f"Voting on Bill {bill_number} has ended."
+                                         f"{await count_votes(self.bot, bill_number, bill)}")
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
+        target: tuple[int, str] | None = vote_target(payload)
+        if target is None:
+            return
+        audits.invalidate_reactors(*target)
+        if payload.user_id != self.bot.user.id:
+            tallies.add_vote(*target)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: RawReactionActionEvent):
+        target: tuple[int, str] | None = vote_target(payload)
+        if target is None:
+            return
+        audits.invalidate_reactors(*target)
+        if payload.user_id != self.bot.user.id:
+            tallies.remove_vote(*target)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: RawReactionClearEvent):
+        record: bills.BillRecord | None = bills.get_bill_by_message(payload.message_id)
+        if record is not None:
+            audits.invalidate_reactors(record.number)
+            tallies.clear_votes(record.number)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: RawReactionClearEmojiEvent):
+        record: bills.BillRecord | None = bills.get_bill_by_message(payload.message_id)
+        key: str | None = tallies.vote_key(payload.emoji)
+        if record is not None and key is not None:
+            audits.invalidate_reactors(record.number, key)
+            tallies.clear_votes(record.number, key)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
+        if "content" in payload.data:
+            bills.update_message(payload.message_id, payload.data["content"])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        remove_message(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            remove_message(message_id)
 
     @commands.command(name="bill", aliases=["Bill"],
                       brief="Assembles a bill with the given text.",
@@ -146,11 +477,10 @@ class Senate(commands.Cog):
         # variable set up
         author: str = ctx.author.mention
 
-        index.increment_index()
-        text: str = assemble_bill(text, index.get_index(), author)
-
-        # send bill
-        msg: Message = await channels.get_senatorial_voting().send(text)
+        # send bill, the number is only used up if sending succeeds
+        async with index.reserve() as bill_index:
+            msg: Message = await channels.get_senatorial_voting().send(assemble_bill(text, bill_index, author))
+        track_bill(msg, bill_index, ctx.author.id, text, [tallies.YES, tallies.NO, tallies.ABSTAIN])
 
         # add reactions
         await msg.add_reaction(emojis.yes_vote)
@@ -183,11 +513,11 @@ class Senate(commands.Cog):
                                    f"\r\n```{ctx.message.clean_content}```")
             return
 
-        index.increment_index()
-        text: str = assemble_amendment(text, index.get_index(), bill_number, author)
-
-        # send amendment
-        msg: Message = await bill.reply(text)
+        # send amendment, the number is only used up if sending succeeds
+        async with index.reserve() as bill_index:
+            msg: Message = await bill.reply(assemble_amendment(text, bill_index, bill_number, author))
+        track_bill(msg, bill_index, ctx.author.id, text, [tallies.YES, tallies.NO, tallies.ABSTAIN],
+                   bills.KIND_AMENDMENT, bill_number)
 
         # add reactions
         await msg.add_reaction(emojis.yes_vote)
@@ -217,10 +547,11 @@ class Senate(commands.Cog):
                                            f"\r\n```{ctx.message.clean_content}```")
             return
 
-        index.increment_index()
-        text: str = assemble_bill(text, index.get_index(), author)
-
-        msg: Message = await channels.get_senatorial_voting().send(text)
+        # send bill, the number is only used up if sending succeeds
+        async with index.reserve() as bill_index:
+            msg: Message = await channels.get_senatorial_voting().send(assemble_bill(text, bill_index, author))
+        track_bill(msg, bill_index, ctx.author.id, text, tallies.OPTIONS[:options] + [tallies.NO, tallies.ABSTAIN],
+                   bills.KIND_OPTION)
 
         # add reactions
         for i in range(0, options):
@@ -264,10 +595,11 @@ class Senate(commands.Cog):
                                    f"\r\n```{ctx.message.clean_content}```")
             return
 
-        index.increment_index()
-        text: str = assemble_amendment(text, index.get_index(), bill_number, author)
-
-        msg: Message = await bill.reply(text)
+        # send amendment, the number is only used up if sending succeeds
+        async with index.reserve() as bill_index:
+            msg: Message = await bill.reply(assemble_amendment(text, bill_index, bill_number, author))
+        track_bill(msg, bill_index, ctx.author.id, text, tallies.OPTIONS[:options] + [tallies.NO, tallies.ABSTAIN],
+                   bills.KIND_OPTION, bill_number)
 
         # add reactions
         for i in range(0, options):
@@ -294,8 +626,6 @@ class Senate(commands.Cog):
                                            f"\r\n```{ctx.message.clean_content}```")
             return
 
-        is_amendment = False
-
         # search bill by index
         try:
             original: Message | None = await find_bill(self.bot, bill_index)
@@ -309,41 +639,64 @@ class Senate(commands.Cog):
                                    f"\r\n```{ctx.message.clean_content}```")
             return
 
-        content: list[str] | None = original.content.split(' ')
-        bill_author: str | None = content[len(content) - 3]
-        bill_number: str | None = None
-        if content[2] == 'Amendment' and content[3] == 'to':
-            bill_number = content[5]
-            bill_number = bill_number.strip('*')
-            is_amendment = True
-
-        # clean changes
-        changes = content[:len(content) - 4]
-        changes_string: str = ''
-        for element in changes:
-            changes_string += f"{element} "
+        parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(original)
 
         # error message
-        if author != bill_author:
+        if parsed is None or parsed.author_id != ctx.author.id:
             await ctx.channel.send(f"This is not your Bill. {author}"
                                    f"\r\n```{ctx.message.clean_content}```")
             return
 
         # assemble new message
-        if is_amendment:
-            content_string: str = assemble_amendment(text, bill_index, int(bill_number), author)
+        if parsed.is_amendment():
+            content_string: str = assemble_amendment(text, bill_index, parsed.parent, author)
         else:
             content_string: str = assemble_bill(text, bill_index, author)
 
         # edit command
         if original is not None:
             await original.edit(content=content_string)
+            search.index_bill(bill_index, text)
+            # bills from before the history was kept start with their current wording
+            if bill_history.version_count(bill_index) == 0:
+                bill_history.add_version(bill_index, parsed.body)
+            version: int = bill_history.add_version(bill_index, text)
             await channels.get_senate().send(f"Previous wording: "
-                                             f"\r\n```{changes_string}```"
-                                             f"\r\nSuccess. {author}")
+                                             f"\r\n```{parsed.wording()}```"
+                                             f"\r\nSuccess, this is version {version}. {author}")
         else:
             await channels.get_senate().send("A bug seems to have crept itself into the code.")
 
+    @commands.command(name="history", aliases=["History"],
+                      brief="Shows the edit history of the bill with the given number.",
+                      help="Shows the edit history of the bill with the given number. \n"
+                           "Give a version to see its wording, or two versions to see the changes between them.")
+    @commands.check(check_senatorial_channels)
+    async def history(self, ctx: commands.Context, bill_number: int, version: int | None = None,
+                      other_version: int | None = None):
+        count: int = bill_history.version_count(bill_number)
+        if count == 0:
+            await ctx.reply(f"Bill {bill_number} has no recorded history.")
+            return
+
+        for requested in [version, other_version]:
+            if requested is not None and not 0 <= requested < count:
+                await ctx.reply(f"Bill {bill_number} only has the versions 0 to {count - 1}.")
+                return
+
+        if version is None:
+            lines: list[str] = [f"Bill {bill_number} has {count} versions:"]
+            lines += [f"Version {i}: {bill_history.get_timestamp(bill_number, i).strftime('%Y-%m-%d %H:%M')}"
+                      for i in range(count)]
+            for page in utils.paginate(lines):
+                await ctx.send(page)
+        elif other_version is None:
+            await ctx.reply(f"Bill {bill_number}, version {version}:"
+                            f"\r\n```{bill_history.get_version(bill_number, version)[:1900]}```")
+        else:
+            await ctx.reply(f"Bill {bill_number}, version {version} to {other_version}:"
+                            f"\r\n```diff\n{bill_history.diff(bill_number, version, other_version)[:1900]}```")
+
     @commands.command(name="index", aliases=["Index"],
                       brief="Overrides the saved bill index.",
                       help="Overrides the saved bill index. \n"
@@ -351,24 +704,18 @@ class Senate(commands.Cog):
     @commands.has_guild_permissions(administrator=True)
     @commands.check(check_senatorial_channels)
     async def set_index(self, ctx: commands.Context, new_index: int):
-        index.set_index(new_index)
+        await index.set_index(new_index)
         msg: Message = await ctx.channel.send(f"Index set to {new_index}.")
         await msg.delete(delay=60)
 
-    @commands.command(name="pass", aliases=["Pass"],
-                      brief="Passes the bill with the given number.",
-                      help="Passes the bill with the given number. \n"
-                           "Marks the given bill as passed using the appropriate emoji "
-                           "and replies to the bill informing about it's passing.")
-    @commands.has_role("Emperor")
+    @commands.command(name="tally", aliases=["Tally"],
+                      brief="Shows the votes on the bill with the given number.",
+                      help="Shows the votes on the bill with the given number. \n"
+                           "Add 'reconcile' to recount the votes from the reactions of the bill.")
     @commands.check(check_senatorial_channels)
-    async def pass_bill(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
+    async def tally(self, ctx: commands.Context, bill_number: int, mode: str = ''):
         # variable set up
         author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
 
         # check that bill_number is valid
         if bill_number > index.get_index():
@@ -376,47 +723,25 @@ class Senate(commands.Cog):
                                            f"\r\n```{ctx.message.clean_content}```")
             return
 
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
-            await ctx.channel.send(f"No bill with that index found. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        await bill.add_reaction(emojis.bill_closed)
-
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} passes."
-                         f"\n{comment}{content[len(content) - 3]}")
+        if mode == "reconcile" or not tallies.has_tally(bill_number):
+            try:
+                bill = await find_bill(self.bot, bill_number)
+            except MessageNotFound:
+                await ctx.channel.send(f"No bill with that index found. {author}"
+                                       f"\r\n```{ctx.message.clean_content}```")
+                return
+            tallies.reconcile(bill_number, bill)
 
-        # clean changes
-        wording: str = ''
-        for element in content[:len(content) - 4]:
-            wording += f"{element} "
+        await ctx.reply(f"Bill {bill_number}:{tallies.format_tally(bill_number)}")
 
-        # count votes
-        wording += count_votes(bill)
-        await channels.get_passed_bills().send(wording)
-
-    @commands.command(name="fail", aliases=["Fail"],
-                      brief="Fails the bill with the given number.",
-                      help="Fails the bill with the given number. \n"
-                           "Marks the given bill as failed using the appropriate emoji "
-                           "and replies to the bill informing about it's failing.")
-    @commands.has_role("Emperor")
+    @commands.command(name="audit", aliases=["Audit"],
+                      brief="Audits the votes on the bill with the given number.",
+                      help="Audits the votes on the bill with the given number. \n"
+                           "Only counts senators, drops everyone who voted more than once and reports the quorum.")
     @commands.check(check_senatorial_channels)
-    async def fail(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
+    async def audit(self, ctx: commands.Context, bill_number: int):
         # variable set up
         author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
 
         # check that bill_number is valid
         if bill_number > index.get_index():
@@ -426,220 +751,202 @@ class Senate(commands.Cog):
 
         try:
             bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
+        except MessageNotFound:
             await ctx.channel.send(f"No bill with that index found. {author}"
                                    f"\r\n```{ctx.message.clean_content}```")
             return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        await bill.add_reaction(emojis.bill_closed)
 
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} does not pass."
-                         f"\n{comment}{content[len(content) - 3]}")
+        await ctx.reply(f"Bill {bill_number}:{await count_votes(self.bot, bill_number, bill, audited=True)}")
 
-    @commands.command(name="veto", aliases=["Veto"],
-                      brief="Vetoes the bill with the given number.",
-                      help="Vetoes the bill with the given number. \n"
-                           "Marks the given bill as vetoed using the appropriate emoji "
-                           "and replies to the bill informing about it being vetoed.")
-    @commands.has_role("Emperor")
+    @commands.command(name="search", aliases=["Search"],
+                      brief="Searches all bills for the given terms.",
+                      help="Searches all bills for the given terms. \n"
+                           "Replies with the best matching bill numbers and their status.")
     @commands.check(check_senatorial_channels)
-    async def veto(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
+    async def search_bills(self, ctx: commands.Context, *, terms: str):
+        results: list[tuple[int, float]] = search.search(terms)
+        if not results:
+            await ctx.reply("No bills found.")
+            return
+
+        results_message: str = f"Bills matching \"{terms}\":"
+        for bill_number, _ in results:
+            record: bills.BillRecord | None = bills.get_bill(bill_number)
+            results_message += f"\nBill {bill_number}: **{'unknown' if record is None else record.status}**"
+        await ctx.reply(results_message)
+
+    @commands.command(name="bills", aliases=["Bills"],
+                      brief="Lists the bills with the given status.",
+                      help="Lists the bills with the given status, open bills by default. \n"
+                           "Possible statuses are open, closed, passed, failed, vetoed, forced, void and withdrawn.")
+    @commands.check(check_senatorial_channels)
+    async def list_bills(self, ctx: commands.Context, status: str = bills.STATUS_OPEN):
+        lines: list[str] = []
+        for record in sorted(bills.get_bills_by_status(status.lower()), key=lambda bill: bill.number):
+            line: str = f"Bill {record.number}"
+            if record.parent is not None:
+                line += f", amendment to Bill {record.parent}"
+            deadline: tuple[float, str] | None = deadlines.get_deadline(record.number)
+            if deadline is not None:
+                line += f", voting ends <t:{int(deadline[0])}:R>"
+            lines.append(line)
+
+        if not lines:
+            await ctx.reply(f"There are no {status} bills.")
+            return
+
+        for page in utils.paginate([f"{len(lines)} {status} bills:"] + lines):
+            await ctx.send(page)
+
+    @commands.command(name="bill-tree", aliases=["billtree", "Billtree", "Bill-tree"],
+                      brief="Shows the bill with the given number with all its amendments.",
+                      help="Shows the bill with the given number with all its amendments, their status and votes. \n"
+                           "Long trees are split into pages, the page can be given after the bill number.")
+    @commands.check(check_senatorial_channels)
+    async def bill_tree(self, ctx: commands.Context, bill_number: int, page: int = 1):
         # variable set up
         author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
-
-        # check that bill_number is valid
-        if bill_number > index.get_index():
-            await ctx.message.channel.send(f"No valid bill number was given. {author}"
-                                           f"\r\n```{ctx.message.clean_content}```")
-            return
 
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
+        if bills.get_bill(bill_number) is None:
             await ctx.channel.send(f"No bill with that index found. {author}"
                                    f"\r\n```{ctx.message.clean_content}```")
             return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
 
-        await bill.add_reaction(emojis.imperial_authority)
+        pages: list[str] = utils.paginate(render_bill_tree(bill_number), 1900)
+        page = min(max(page, 1), len(pages))
+        footer: str = f"\nPage {page}/{len(pages)}" if len(pages) > 1 else ''
+        await ctx.reply(f"{pages[page - 1]}{footer}")
 
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} is vetoed."
-                         f"\r\n{comment}{content[len(content) - 3]}")
-
-    @commands.command(name="forcethrough", aliases=["Forcethrough"],
-                      brief="Forces the bill with the given number through.",
-                      help="Forces the bill with the given number through. \n"
-                           "Marks the given bill as forced through using the appropriate emoji "
-                           "and replies to the bill informing about it being forced through.")
+    @commands.command(name="deadline", aliases=["Deadline"],
+                      brief="Sets the voting deadline of the bill with the given number.",
+                      help="Sets the voting deadline of the bill with the given number in hours from now. \n"
+                           "At the deadline the votes are posted to #senate, or the bill fails if 'fail' is given. \n"
+                           "A deadline of 0 hours removes the deadline.")
     @commands.has_role("Emperor")
     @commands.check(check_senatorial_channels)
-    async def forcethrough(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
+    async def deadline(self, ctx: commands.Context, bill_number: int, hours: float,
+                       action: Literal["summary", "fail"] = deadlines.ACTION_SUMMARY):
         # variable set up
         author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
 
-        # check that bill_number is valid
-        if bill_number > index.get_index():
-            await ctx.message.channel.send(f"No valid bill number was given. {author}"
-                                           f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
-            await ctx.channel.send(f"No bill with that index found. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
+        record: bills.BillRecord | None = bills.get_bill(bill_number)
+        if record is None or not record.is_open():
+            await ctx.channel.send(f"No open bill with that index found. {author}"
                                    f"\r\n```{ctx.message.clean_content}```")
             return
 
-        await bill.add_reaction(emojis.imperial_mandate)
+        if hours <= 0:
+            await deadlines.remove_deadline(bill_number)
+            await ctx.reply(f"Removed the deadline of Bill {bill_number}.")
+            return
 
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} is forced through."
-                         f"\r\n{comment}{content[len(content) - 3]}")
+        due: float = deadlines.now() + hours * 60 * 60
+        await deadlines.set_deadline(bill_number, due, action)
+        await ctx.reply(f"Voting on Bill {bill_number} ends <t:{int(due)}:R>.")
 
-    @commands.command(name="void", aliases=["Void"],
-                      brief="Voids the bill with the given number.",
-                      help="Voids the bill with the given number. \n"
-                           "Marks the given bill as voided using the appropriate emoji "
-                           "and replies to the bill informing about it being voided.")
-    @commands.check(roles.check_is_staff)
+    @commands.command(name="senate-stats", aliases=["senatestats", "Senatestats", "Senate-stats"],
+                      brief="Shows statistics about the senate or a senator.",
+                      help="Shows statistics about the senate or the given senator. \n"
+                           "The period can be 'all', a month like '2022-05' or the last months like '6m'.")
     @commands.check(check_senatorial_channels)
-    async def void(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
+    async def show_senate_stats(self, ctx: commands.Context, senator: Member | None = None,
+                                period: str = senate_stats.ALL):
+        if not senate_stats.is_period(period):
+            await ctx.channel.send(f"The period has to be 'all', a month like '2022-05' or the last months like '6m'. "
+                                   f"{ctx.author.mention}\r\n```{ctx.message.clean_content}```")
+            return
+
+        senator_id: int | None = None if senator is None else senator.id
+        stats: dict[str, int] = senate_stats.get_stats(senator_id, period)
+
+        def count(status: str) -> int:
+            return stats.get(status, 0)
+
+        decided: int = count(bills.STATUS_PASSED) + count(bills.STATUS_FAILED) + count(bills.STATUS_VETOED) + \
+            count(bills.STATUS_FORCED) + count(bills.STATUS_CLOSED)
+        pass_rate: str = f"{(count(bills.STATUS_PASSED) + count(bills.STATUS_FORCED)) / decided * 100:.0f}%" \
+            if decided > 0 else "-"
+        veto_rate: str = f"{count(bills.STATUS_VETOED) / decided * 100:.0f}%" if decided > 0 else "-"
+        turnout: str = f"{count(senate_stats.VOTES) / count(senate_stats.VOTED):.1f}" \
+            if count(senate_stats.VOTED) > 0 else "-"
+        per_month: float = count(senate_stats.PROPOSED) / senate_stats.count_months(senator_id, period)
+
+        await ctx.reply(f"Statistics for **{'the senate' if senator is None else senator.display_name}** "
+                        f"({period}):"
+                        f"\nBills proposed: **{count(senate_stats.PROPOSED)}** ({per_month:.1f} per month)"
+                        f"\nPassed: **{count(bills.STATUS_PASSED)}**, failed: **{count(bills.STATUS_FAILED)}**, "
+                        f"vetoed: **{count(bills.STATUS_VETOED)}**, forced through: **{count(bills.STATUS_FORCED)}**"
+                        f"\nVoid: **{count(bills.STATUS_VOID)}**, withdrawn: **{count(bills.STATUS_WITHDRAWN)}**"
+                        f"\nPass rate: **{pass_rate}**, veto rate: **{veto_rate}**"
+                        f"\nAverage votes per bill: **{turnout}**")
 
-        # variable set up
-        author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
+    @commands.command(name="pass", aliases=["Pass"],
+                      brief="Passes the bills with the given numbers.",
+                      help="Passes the bills with the given numbers. \n"
+                           "Marks the given bills as passed using the appropriate emoji "
+                           "and replies to the bills informing about their passing. \n"
+                           "Add 'audited' before the comment to only count the votes of senators who voted once.")
+    @commands.has_role("Emperor")
+    @commands.check(check_senatorial_channels)
+    async def pass_bill(self, ctx: commands.Context, bill_numbers: commands.Greedy[int],
+                        audited: Literal["audited"] | None = None, *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["pass"], bill_numbers, comment, audited is not None)
 
-        # check that bill_number is valid
-        if bill_number > index.get_index():
-            await ctx.message.channel.send(f"No valid bill number was given. {author}"
-                                           f"\r\n```{ctx.message.clean_content}```")
-            return
+    @commands.command(name="fail", aliases=["Fail"],
+                      brief="Fails the bills with the given numbers.",
+                      help="Fails the bills with the given numbers. \n"
+                           "Marks the given bills as failed using the appropriate emoji "
+                           "and replies to the bills informing about their failing.")
+    @commands.has_role("Emperor")
+    @commands.check(check_senatorial_channels)
+    async def fail(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["fail"], bill_numbers, comment)
 
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
-            await ctx.channel.send(f"No bill with that index found. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
+    @commands.command(name="veto", aliases=["Veto"],
+                      brief="Vetoes the bills with the given numbers.",
+                      help="Vetoes the bills with the given numbers. \n"
+                           "Marks the given bills as vetoed using the appropriate emoji "
+                           "and replies to the bills informing about them being vetoed.")
+    @commands.has_role("Emperor")
+    @commands.check(check_senatorial_channels)
+    async def veto(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["veto"], bill_numbers, comment)
 
-        await bill.add_reaction(emojis.void)
+    @commands.command(name="forcethrough", aliases=["Forcethrough"],
+                      brief="Forces the bills with the given numbers through.",
+                      help="Forces the bills with the given numbers through. \n"
+                           "Marks the given bills as forced through using the appropriate emoji "
+                           "and replies to the bills informing about them being forced through.")
+    @commands.has_role("Emperor")
+    @commands.check(check_senatorial_channels)
+    async def forcethrough(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["forcethrough"], bill_numbers, comment)
 
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} is void."
-                         f"\r\n{comment} {content[len(content) - 3]}")
+    @commands.command(name="void", aliases=["Void"],
+                      brief="Voids the bills with the given numbers.",
+                      help="Voids the bills with the given numbers. \n"
+                           "Marks the given bills as voided using the appropriate emoji "
+                           "and replies to the bills informing about them being voided.")
+    @commands.check(roles.check_is_staff)
+    @commands.check(check_senatorial_channels)
+    async def void(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["void"], bill_numbers, comment)
 
     @commands.command(name="unvoid", aliases=["Unvoid"],
-                      brief="Unvoids the bill with the given number.",
-                      help="Unvoids the bill with the given number. \n"
-                           "Unmarks the given bill as voided using the appropriate emoji "
-                           "and replies to the bill informing about it being unvoided.")
+                      brief="Unvoids the bills with the given numbers.",
+                      help="Unvoids the bills with the given numbers. \n"
+                           "Unmarks the given bills as voided using the appropriate emoji "
+                           "and replies to the bills informing about them being unvoided.")
     @commands.check(roles.check_is_staff)
     @commands.check(check_senatorial_channels)
-    async def unvoid(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
-        # variable set up
-        author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
-
-        # check that bill_number is valid
-        if bill_number > index.get_index():
-            await ctx.message.channel.send(f"No valid bill number was given. {author}"
-                                           f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound:
-            await ctx.channel.send(f"No bill with that index found. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-        # check that the bill isn't closed already
-        if not any(reaction.emoji is emojis.void for reaction in bill.reactions):
-            await ctx.channel.send(f"Bill isn't void. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        await bill.remove_reaction(emojis.void, self.bot.user)
-
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} is unvoided."
-                         f"\r\n{comment} {content[len(content) - 3]}")
+    async def unvoid(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["unvoid"], bill_numbers, comment)
 
     @commands.command(name="withdraw", aliases=["Withdraw"],
-                      brief="Withdraws the bill with the given number.",
-                      help="Withdraws the bill with the given number. \n"
-                           "Marks the given bill as withdrawn using the appropriate emoji "
-                           "and replies to the bill informing about it's withdrawal.")
+                      brief="Withdraws the bills with the given numbers.",
+                      help="Withdraws the bills with the given numbers. \n"
+                           "Marks the given bills as withdrawn using the appropriate emoji "
+                           "and replies to the bills informing about their withdrawal.")
     @commands.check(check_senatorial_channels)
-    async def withdraw(self, ctx: commands.Context, bill_number: int, *, comment: str = ''):
-        await ctx.message.delete()
-
-        # variable set up
-        author: str = ctx.author.mention
-        if comment != '':
-            comment += ' '
-
-        # check that bill_number is valid
-        if bill_number > index.get_index():
-            await ctx.message.channel.send(f"No valid bill number was given. {author}"
-                                           f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        try:
-            bill = await find_bill(self.bot, bill_number)
-        except MessageNotFound as e:
-            await ctx.channel.send(f"No bill with that index found. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-        # check that the bill isn't closed already
-        if await check_bill_concluded(bill):
-            await ctx.channel.send(f"Bill has already been concluded. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        content: list[str] | None = bill.content.split(' ')
-        bill_author: str | None = content[len(content) - 3]
-        # error message
-        if author != bill_author:
-            await ctx.channel.send(f"This is not your Bill. {author}"
-                                   f"\r\n```{ctx.message.clean_content}```")
-            return
-
-        await bill.add_reaction(emojis.withdrawn)
-
-        content: list[str] = bill.content.split(' ')
-        await bill.reply(f"Bill {bill_number} is withdrawn."
-                         f"\r\n{comment}{content[len(content) - 3]}")
+    async def withdraw(self, ctx: commands.Context, bill_numbers: commands.Greedy[int], *, comment: str = ''):
+        await conclude(self.bot, ctx, _conclusions["withdraw"], bill_numbers, comment)
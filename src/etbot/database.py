@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class Database:
+    """
+    A sqlite database that is used off the event loop. Connections belong to the thread that created them, so every
+    statement runs on the same single thread, in the order it was submitted, in its own transaction.
+    """
+
+    def __init__(self, path: str, create: Callable[[sqlite3.Connection], None]):
+        self.path: str = path
+        self.create: Callable[[sqlite3.Connection], None] = create
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=path)
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection: sqlite3.Connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.create(connection)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _execute(self, function: Callable[[sqlite3.Connection], Any]) -> Any:
+        connection: sqlite3.Connection = self._connect()
+        with connection:
+            return function(connection)
+
+    def _report(self, future: Future) -> None:
+        if future.exception() is not None:
+            logging.error(f"Writing {self.path} failed", exc_info=future.exception())
+
+    async def run(self, function: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        Runs a function on the connection and waits for its result.
+        """
+        return await asyncio.wrap_future(self._executor.submit(self._execute, function))
+
+    def submit(self, function: Callable[[sqlite3.Connection], Any]) -> Future:
+        """
+        Runs a function on the connection without waiting for it, failures are logged.
+        """
+        future: Future = self._executor.submit(self._execute, function)
+        future.add_done_callback(self._report)
+        return future
@@ -4,11 +4,15 @@ import logging
 import os
 import sys
 
+from disnake import Intents, Message
 from disnake.ext import commands
 
-from vars import channels, emojis, roles, messages, warnings
+from vars import channels, emojis, roles, messages, warnings, bills, search, senate_stats, router
 
-bot = commands.Bot(command_prefix='&')
+# the member list is needed to tell senators from everyone else, it is chunked on startup and kept current
+intents: Intents = Intents.default()
+intents.members = True
+bot = commands.Bot(command_prefix='&', intents=intents)
 testing = False
 
 
@@ -27,11 +31,21 @@ async def on_ready() -> None:
         roles.initialize_roles(bot)
         messages.initialize_messages()
 
-    await warnings.init_warnings(bot)
+    router.build()
+    await warnings.init_warnings()
+    warnings.warm_names(bot)
+    await bills.backfill()
+    senate_stats.backfill()
+    await search.backfill()
 
     print(f"Anwesend {bot.user.name}")
 
 
+@bot.listen("on_message")
+async def route_message(message: Message) -> None:
+    await router.dispatch(message)
+
+
 def load_extensions() -> None:
     for filename in os.listdir("./src/etbot/cogs"):
         if filename.endswith(".py") and filename != "__init__.py":
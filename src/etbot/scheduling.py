@@ -0,0 +1,11 @@
+import asyncio
+
+
+async def wait(changed: asyncio.Event, timeout: float | None) -> None:
+    """
+    Sleeps until the timeout passed or the event is set, whichever comes first. No timeout waits for the event alone.
+    """
+    try:
+        await asyncio.wait_for(changed.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
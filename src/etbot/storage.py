@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """
+    Reads a json file. Returns the default if the file does not exist yet.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Writes a json file atomically, a crash mid-write leaves the previous file intact.
+    """
+    write_text(path, json.dumps(data))
+
+
+def write_text(path: str, text: str) -> None:
+    """
+    Writes a text file atomically, a crash mid-write leaves the previous file intact.
+    """
+    directory: str = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
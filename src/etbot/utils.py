@@ -1,6 +1,11 @@
-from disnake import Message
-from disnake.abc import User
+import asyncio
+import datetime
+from typing import Any, Coroutine
+
+from disnake import Message, NotFound, Object, Thread
+from disnake.abc import GuildChannel, User
 from disnake.ext.commands import Context
+from disnake.utils import snowflake_time
 
 import main
 
@@ -18,3 +23,57 @@ def user_is_not_me(usr: User): return not usr == main.bot.user
 
 
 def has_embed_or_attachment(msg: Message): return True if len(msg.embeds) > 0 or len(msg.attachments) > 0 else False
+
+
+def paginate(lines: list[str], limit: int = 2000) -> list[str]:
+    """
+    Joins lines into as few messages as possible without going over the discord character limit.
+    """
+    pages: list[str] = []
+    page: str = ''
+    for line in lines:
+        line = line[:limit]
+        if page and len(page) + 1 + len(line) > limit:
+            pages.append(page)
+            page = ''
+        page = f"{page}\n{line}" if page else line
+    if page:
+        pages.append(page)
+    return pages
+
+
+async def gather_or_cancel(*coroutines: Coroutine) -> list[Any]:
+    """
+    Runs coroutines concurrently like asyncio.gather, but cancels the ones still running as soon as one fails,
+    so none of them keeps going detached from its caller.
+    """
+    running: list[asyncio.Task] = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*running)
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        raise
+
+
+async def delete_messages(channel: GuildChannel | Thread, message_ids: list[int]) -> None:
+    """
+    Deletes exactly the given messages, in bulk where possible, skipping those that are gone already.
+    Bulk deletes only accept messages younger than 14 days, older ones are deleted one by one.
+    """
+    cutoff: datetime.datetime = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=14, minutes=-1)
+    recent: list[int] = [message_id for message_id in message_ids if snowflake_time(message_id) > cutoff]
+    single: list[int] = [message_id for message_id in message_ids if snowflake_time(message_id) <= cutoff]
+    for i in range(0, len(recent), 100):
+        try:
+            await channel.delete_messages([Object(message_id) for message_id in recent[i:i + 100]])
+        except NotFound:
+            # a message already deleted by hand fails the whole chunk
+            single += recent[i:i + 100]
+
+    for message_id in single:
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except NotFound:
+            pass
@@ -0,0 +1,238 @@
+import datetime
+import sqlite3
+import sys
+from typing import Any
+
+from disnake import Message, Thread, Object
+from disnake.abc import GuildChannel
+
+import database
+import storage
+
+this = sys.modules[__name__]
+
+_settings_file: str = "archive.json"
+enabled: bool = False
+# counts the times the coverage was marked stale
+_session: int = 0
+
+
+class ArchivedMessage:
+    """
+    A message as stored in the archive.
+    """
+
+    def __init__(self, id: int, channel_id: int, author_id: int, created_at: float, content: str, attachments: str,
+                 deleted: int):
+        self.id: int = id
+        self.channel_id: int = channel_id
+        self.author_id: int = author_id
+        self.created_at: datetime.datetime = datetime.datetime.utcfromtimestamp(created_at)
+        self.content: str = content
+        self.attachments: str = attachments
+        self.deleted: bool = bool(deleted)
+
+    def __str__(self):
+        return f"{self.id}\n{self.created_at}{' (deleted)' if self.deleted else ''}\n{self.content}\n\n\n"
+
+
+def _create(connection: sqlite3.Connection) -> None:
+    connection.execute("CREATE TABLE IF NOT EXISTS messages ("
+                       "id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, author_id INTEGER NOT NULL, "
+                       "created_at REAL NOT NULL, content TEXT NOT NULL, attachments TEXT NOT NULL, "
+                       "deleted INTEGER NOT NULL DEFAULT 0, guild_id INTEGER)")
+    # the coverage of a channel is the archived part of its history, complete once it reaches the first message
+    # and live while everything sent since newest_id was archived as it came in
+    connection.execute("CREATE TABLE IF NOT EXISTS coverage ("
+                       "channel_id INTEGER PRIMARY KEY, oldest_id INTEGER NOT NULL, newest_id INTEGER NOT NULL, "
+                       "complete INTEGER NOT NULL DEFAULT 0, live INTEGER NOT NULL DEFAULT 0)")
+    # archives from before the messages knew their guild and the coverage its live edge, the guilds are assigned
+    # by assign_guild and the coverage counts as stale until it is backfilled again
+    for table, column, definition in [("messages", "guild_id", "INTEGER"),
+                                      ("coverage", "live", "INTEGER NOT NULL DEFAULT 0")]:
+        if column not in [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    connection.execute("CREATE INDEX IF NOT EXISTS messages_author ON messages (author_id, created_at)")
+    connection.execute("CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel_id, created_at)")
+
+
+_database: database.Database = database.Database("archive.db", _create)
+
+
+def _row(message: Message) -> tuple:
+    return (message.id, message.channel.id, message.author.id, message.created_at.timestamp(), message.clean_content,
+            ' '.join(attachment.url for attachment in message.attachments), message.guild.id)
+
+
+async def add_messages(messages: list[Message]) -> None:
+    """
+    Archives guild messages and moves the live coverage of their channels along.
+    """
+    rows: list[tuple] = [_row(message) for message in messages]
+    newest: dict[int, int] = {}
+    for message in messages:
+        newest[message.channel.id] = max(newest.get(message.channel.id, 0), message.id)
+
+    def insert(connection: sqlite3.Connection) -> None:
+        connection.executemany("INSERT OR REPLACE INTO messages (id, channel_id, author_id, created_at, content, "
+                               "attachments, guild_id) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany("UPDATE coverage SET newest_id = MAX(newest_id, ?) WHERE channel_id = ? AND live = 1",
+                               [(message_id, channel_id) for channel_id, message_id in newest.items()])
+
+    await _database.run(insert)
+
+
+async def edit_message(message_id: int, content: str) -> None:
+    def update(connection: sqlite3.Connection) -> None:
+        connection.execute("UPDATE messages SET content = ? WHERE id = ?", (content, message_id))
+
+    await _database.run(update)
+
+
+async def delete_messages(message_ids: list[int]) -> None:
+    """
+    Marks messages as deleted, they stay in the archive for moderation.
+    """
+    def update(connection: sqlite3.Connection) -> None:
+        connection.executemany("UPDATE messages SET deleted = 1 WHERE id = ?", [(id,) for id in message_ids])
+
+    await _database.run(update)
+
+
+async def find_messages(guild_id: int, author_id: int | None = None, channel_id: int | None = None,
+                        after: datetime.datetime | None = None, before: datetime.datetime | None = None,
+                        keyword: str | None = None, limit: int | None = None) -> list[ArchivedMessage]:
+    """
+    Returns the archived messages of a guild matching all given filters, oldest first.
+    """
+    conditions: list[str] = []
+    parameters: list[Any] = []
+    for condition, parameter in [("guild_id = ?", guild_id), ("author_id = ?", author_id),
+                                 ("channel_id = ?", channel_id),
+                                 ("created_at >= ?", None if after is None else after.timestamp()),
+                                 ("created_at < ?", None if before is None else before.timestamp()),
+                                 ("content LIKE ?", None if keyword is None else f"%{keyword}%")]:
+        if parameter is not None:
+            conditions.append(condition)
+            parameters.append(parameter)
+
+    query: str = "SELECT id, channel_id, author_id, created_at, content, attachments, deleted FROM messages " \
+                 "WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+
+    rows: list[tuple] = await _database.run(lambda connection: connection.execute(query, parameters).fetchall())
+    return [ArchivedMessage(*row) for row in rows]
+
+
+async def get_unassigned_channels() -> list[int]:
+    """
+    Returns the channels with messages archived before the messages knew their guild.
+    """
+    rows: list[tuple] = await _database.run(lambda connection: connection.execute(
+        "SELECT DISTINCT channel_id FROM messages WHERE guild_id IS NULL").fetchall())
+    return [row[0] for row in rows]
+
+
+async def assign_guild(channel_id: int, guild_id: int) -> None:
+    def update(connection: sqlite3.Connection) -> None:
+        connection.execute("UPDATE messages SET guild_id = ? WHERE channel_id = ? AND guild_id IS NULL",
+                           (guild_id, channel_id))
+
+    await _database.run(update)
+
+
+async def get_coverage(channel_id: int) -> tuple[int, int, bool, bool] | None:
+    row: tuple | None = await _database.run(lambda connection: connection.execute(
+        "SELECT oldest_id, newest_id, complete, live FROM coverage WHERE channel_id = ?", (channel_id,)).fetchone())
+    return None if row is None else (row[0], row[1], bool(row[2]), bool(row[3]))
+
+
+async def _set_coverage(channel_id: int, oldest_id: int, newest_id: int, complete: bool, live: bool) -> None:
+    def update(connection: sqlite3.Connection) -> None:
+        # live messages may have moved the newest id past the crawl in the meantime
+        connection.execute("INSERT INTO coverage (channel_id, oldest_id, newest_id, complete, live) "
+                           "VALUES (?, ?, ?, ?, ?) ON CONFLICT (channel_id) DO UPDATE SET "
+                           "oldest_id = excluded.oldest_id, newest_id = MAX(newest_id, excluded.newest_id), "
+                           "complete = excluded.complete, live = excluded.live",
+                           (channel_id, oldest_id, newest_id, int(complete), int(live)))
+
+    await _database.run(update)
+
+
+async def mark_stale() -> None:
+    """
+    Marks the coverage of every channel as stale, for when messages may have been sent without being archived.
+    A backfill that started before is not allowed to mark its channel live again.
+    """
+    this._session += 1
+
+    def update(connection: sqlite3.Connection) -> None:
+        connection.execute("UPDATE coverage SET live = 0")
+
+    await _database.run(update)
+
+
+async def get_stale(channel_ids: list[int]) -> list[int] | None:
+    """
+    Returns the channels whose archive misses messages sent while the bot was offline or the archive was off.
+    Returns None if any of the channels was never backfilled up to its first message.
+    """
+    rows: list[tuple] = await _database.run(lambda connection: connection.execute(
+        "SELECT channel_id, complete, live FROM coverage").fetchall())
+    coverage: dict[int, tuple[bool, bool]] = {row[0]: (bool(row[1]), bool(row[2])) for row in rows}
+    if any(not coverage.get(channel_id, (False, False))[0] for channel_id in channel_ids):
+        return None
+    return [channel_id for channel_id in channel_ids if not coverage[channel_id][1]]
+
+
+async def backfill_channel(channel: GuildChannel | Thread) -> int:
+    """
+    Archives the parts of a channel's history that are not archived yet. Returns the number of archived messages.
+    """
+    coverage: tuple[int, int, bool, bool] | None = await get_coverage(channel.id)
+    oldest_id, newest_id, complete, live = coverage if coverage is not None else (None, None, False, False)
+    # a crawl that starts at the latest message is caught up with the live archive right away
+    live = live or newest_id is None
+    session: int = _session
+    counter: int = 0
+
+    # everything since the newest archived message, until the crawl caught up with the live archive
+    while newest_id is not None:
+        history: list[Message] = await channel.history(limit=100, after=Object(newest_id), oldest_first=True) \
+            .flatten()
+        if history:
+            await add_messages(history)
+            counter += len(history)
+            newest_id = history[-1].id
+        live = len(history) < 100
+        await _set_coverage(channel.id, oldest_id, newest_id, complete, live and session == _session)
+        if live:
+            break
+
+    # everything before the oldest archived message, the whole channel if nothing is archived
+    while not complete:
+        history = await channel.history(limit=100, before=None if oldest_id is None else Object(oldest_id)).flatten()
+        if history:
+            await add_messages(history)
+            counter += len(history)
+            newest_id = history[0].id if newest_id is None else newest_id
+            oldest_id = history[-1].id
+        complete = len(history) < 100
+        # an empty channel is covered from the very first id on
+        await _set_coverage(channel.id, oldest_id or 0, newest_id or 0, complete, live and session == _session)
+
+    return counter
+
+
+def set_enabled(value: bool) -> None:
+    this.enabled = value
+    storage.write_json(_settings_file, {"enabled": value})
+
+
+def init_archive() -> None:
+    """
+    Reads whether the archive is enabled from the file.
+    """
+    this.enabled = storage.read_json(_settings_file, {"enabled": False})["enabled"]
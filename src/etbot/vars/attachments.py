@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+
+import aiohttp
+from disnake import Message
+
+import storage
+
+this = sys.modules[__name__]
+
+_file: str = "attachments.json"
+_directory: str = "attachments"
+# bytes the whole store may take up before the least recently used attachments are evicted
+_max_size: int = 2 * 1024 ** 3
+_concurrent_downloads: int = 4
+
+_download_limit: asyncio.Semaphore = asyncio.Semaphore(_concurrent_downloads)
+_lock: asyncio.Lock = asyncio.Lock()
+# sha-256 -> {"size", "filename"}, least recently used first
+_stored: OrderedDict[str, dict] = OrderedDict()
+_size: int = 0
+
+
+class Budget:
+    """
+    The bytes a purge or save may still download, shared by all of its downloads.
+    """
+
+    def __init__(self, remaining: int):
+        self.remaining: int = remaining
+
+    def take(self, size: int) -> bool:
+        if size > self.remaining:
+            return False
+        self.remaining -= size
+        return True
+
+
+def _path(digest: str) -> str:
+    return os.path.join(_directory, digest[:2], digest)
+
+
+def _write(data: bytes) -> str:
+    """
+    Stores data under its hash unless it is stored already. Returns the hash.
+    """
+    digest: str = hashlib.sha256(data).hexdigest()
+    path: str = _path(digest)
+    if os.path.exists(path):
+        return digest
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # concurrent downloads of the same file each write their own temporary file, whichever is replaced last wins
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException as exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # another download stored the same content in the meantime
+        if not isinstance(exception, OSError) or not os.path.exists(path):
+            raise
+    return digest
+
+
+def _evict() -> list[str]:
+    """
+    Drops the least recently used attachments from the index until the store fits. Returns their hashes.
+    """
+    evicted: list[str] = []
+    while this._size > _max_size and _stored:
+        digest, entry = _stored.popitem(last=False)
+        this._size -= entry["size"]
+        evicted.append(digest)
+    return evicted
+
+
+def _remove(digests: list[str]) -> None:
+    for digest in digests:
+        try:
+            os.remove(_path(digest))
+        except FileNotFoundError:
+            pass
+
+
+async def _download(session: aiohttp.ClientSession, url: str, filename: str) -> str | None:
+    async with _download_limit:
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return None
+                data: bytes = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    try:
+        digest: str = await asyncio.to_thread(_write, data)
+    except OSError:
+        logging.exception(f"Storing attachment {filename} failed")
+        return None
+    if digest not in _stored:
+        _stored[digest] = {"size": len(data), "filename": filename}
+        this._size += len(data)
+    _stored.move_to_end(digest)
+    return digest
+
+
+async def store_urls(files: list[tuple[str, str, int]], budget: Budget) -> dict[str, str]:
+    """
+    Downloads (url, filename, size) files concurrently into the store, skipping those that exceed the byte budget.
+    Returns url -> hash of the stored files.
+    """
+    accepted: list[tuple[str, str]] = [(url, filename) for url, filename, size in files if budget.take(size)]
+    if not accepted:
+        return {}
+
+    async with aiohttp.ClientSession() as session:
+        digests: list[str | None] = await asyncio.gather(*(_download(session, url, filename)
+                                                           for url, filename in accepted))
+
+    # the index is only changed on the event loop, the threads get the files and a snapshot
+    evicted: list[str] = _evict()
+    async with _lock:
+        # an evicted attachment may have been stored again by another download in the meantime
+        await asyncio.to_thread(_remove, [digest for digest in evicted if digest not in _stored])
+        await asyncio.to_thread(storage.write_json, _file, _snapshot())
+    return {url: digest for (url, _), digest in zip(accepted, digests) if digest is not None}
+
+
+async def store_messages(messages: list[Message], budget: Budget) -> dict[str, str]:
+    """
+    Stores the attachments of messages. Returns attachment url -> hash.
+    """
+    return await store_urls([(attachment.url, attachment.filename, attachment.size)
+                             for message in messages for attachment in message.attachments], budget)
+
+
+def describe(message: Message, stored: dict[str, str]) -> str:
+    """
+    Returns the attachments of a message for a transcript, with their hashes if they are stored.
+    """
+    return ', '.join(f"{attachment.filename} (sha256:{stored[attachment.url]})" if attachment.url in stored
+                     else f"{attachment.filename} (not stored)" for attachment in message.attachments)
+
+
+def find(prefix: str) -> tuple[str, str, str] | None:
+    """
+    Returns the hash, filename and path of the stored attachment whose hash starts with the prefix.
+    """
+    matches: list[str] = [digest for digest in _stored if digest.startswith(prefix.lower())]
+    if len(matches) != 1:
+        return None
+    _stored.move_to_end(matches[0])
+    return matches[0], _stored[matches[0]]["filename"], _path(matches[0])
+
+
+def _snapshot() -> list[dict]:
+    return [{"hash": digest, **entry} for digest, entry in _stored.items()]
+
+
+def init_attachments() -> None:
+    """
+    Reads the index of the store from the file.
+    """
+    _stored.clear()
+    for entry in storage.read_json(_file, []):
+        _stored[entry["hash"]] = {"size": entry["size"], "filename": entry["filename"]}
+    this._size = sum(entry["size"] for entry in _stored.values())
@@ -0,0 +1,109 @@
+import asyncio
+
+from disnake import Guild, Message, Reaction
+
+from vars import roles, tallies
+
+# share of all senators that has to vote for a bill to be quorate
+_quorum: float = 0.5
+# how many reactions have their users fetched at the same time
+_concurrent_fetches: int = 4
+
+_fetch_limit: asyncio.Semaphore = asyncio.Semaphore(_concurrent_fetches)
+_reactors: dict[int, dict[str, set[int]]] = {}
+# (bill number, vote or None for all votes) -> how often the cached reactors were invalidated
+_generations: dict[tuple[int, str | None], int] = {}
+
+
+class Audit:
+    """
+    The votes on a bill, counting only senators who voted once.
+    """
+
+    def __init__(self, tally: dict[str, int], double_voters: set[int], non_senators: set[int], voters: int,
+                 senators: int):
+        self.tally: dict[str, int] = tally
+        self.double_voters: set[int] = double_voters
+        self.non_senators: set[int] = non_senators
+        self.voters: int = voters
+        self.senators: int = senators
+
+    def is_quorate(self) -> bool:
+        return self.senators > 0 and self.voters / self.senators >= _quorum
+
+    def __str__(self):
+        turnout: float = self.voters / self.senators * 100 if self.senators > 0 else 0
+        return f"Senators voting: **{self.voters}/{self.senators}** ({turnout:.0f}%), " \
+               f"{'quorate' if self.is_quorate() else '**not quorate**'}" \
+               f"\nDouble votes dropped: **{len(self.double_voters)}**" \
+               f"\nNon-senator votes dropped: **{len(self.non_senators)}**"
+
+
+def _generation(bill_number: int, key: str) -> int:
+    return _generations.get((bill_number, None), 0) + _generations.get((bill_number, key), 0)
+
+
+def invalidate_reactors(bill_number: int, key: str | None = None) -> None:
+    """
+    Forgets the cached reactors of a bill, either all of them or only those of one vote.
+    """
+    # counted up so a fetch that was running meanwhile does not cache what it read before the change
+    _generations[(bill_number, key)] = _generations.get((bill_number, key), 0) + 1
+    if key is None:
+        _reactors.pop(bill_number, None)
+    elif bill_number in _reactors:
+        _reactors[bill_number].pop(key, None)
+
+
+async def _fetch_users(reaction: Reaction) -> set[int]:
+    async with _fetch_limit:
+        return {user.id async for user in reaction.users(limit=None)}
+
+
+async def get_reactors(bill_number: int, bill: Message) -> dict[str, set[int]]:
+    """
+    Returns the ids of the users behind each vote on a bill, fetching only votes that are not cached.
+    """
+    reactors: dict[str, set[int]] = dict(_reactors.get(bill_number, {}))
+    missing: list[tuple[str, Reaction, int]] = []
+    for reaction in bill.reactions:
+        key: str | None = tallies.vote_key(reaction.emoji)
+        if key is not None and key not in reactors:
+            missing.append((key, reaction, _generation(bill_number, key)))
+
+    users: list[set[int]] = await asyncio.gather(*(_fetch_users(reaction) for _, reaction, _ in missing))
+    for (key, _, generation), user_ids in zip(missing, users):
+        reactors[key] = user_ids
+        if _generation(bill_number, key) == generation:
+            _reactors.setdefault(bill_number, {})[key] = user_ids
+    return reactors
+
+
+async def audit(bill_number: int, bill: Message, bot_id: int) -> Audit:
+    """
+    Counts the votes on a bill from senators only, dropping everyone who voted more than once.
+    """
+    reactors: dict[str, set[int]] = await get_reactors(bill_number, bill)
+    # role.members only knows the cached members, which are all of them only once the guild is chunked
+    guild: Guild = roles.senator.guild
+    if not guild.chunked:
+        await guild.chunk()
+    senators: set[int] = {member.id for member in roles.senator.members}
+
+    votes: dict[int, int] = {}
+    non_senators: set[int] = set()
+    for user_ids in reactors.values():
+        for user_id in user_ids:
+            if user_id == bot_id:
+                continue
+            if user_id not in senators:
+                non_senators.add(user_id)
+                continue
+            votes[user_id] = votes.get(user_id, 0) + 1
+    double_voters: set[int] = {user_id for user_id, count in votes.items() if count > 1}
+
+    tally: dict[str, int] = {}
+    for key, user_ids in reactors.items():
+        tally[key] = sum(1 for user_id in user_ids if user_id in votes and user_id not in double_voters)
+
+    return Audit(tally, double_voters, non_senators, len(votes) - len(double_voters), len(senators))
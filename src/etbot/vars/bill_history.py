@@ -0,0 +1,89 @@
+import datetime
+import difflib
+import os
+import re
+
+import storage
+
+_directory: str = "bill_history"
+# every n-th version is stored in full, the versions in between as deltas to their predecessor
+_full_interval: int = 8
+_token_pattern: re.Pattern = re.compile(r"\s+|\S+")
+# bill number -> versions, loaded from the files when first needed
+_histories: dict[int, list[dict]] = {}
+
+
+def _path(bill_number: int) -> str:
+    return os.path.join(_directory, f"{bill_number}.json")
+
+
+def _load(bill_number: int) -> list[dict]:
+    if bill_number not in _histories:
+        _histories[bill_number] = storage.read_json(_path(bill_number), [])
+    return _histories[bill_number]
+
+
+def _tokenize(text: str) -> list[str]:
+    return _token_pattern.findall(text)
+
+
+def _delta(old: str, new: str) -> list[list]:
+    """
+    Returns the changes from one text to the next as [start, end, replacement] on the words of the old text.
+    """
+    old_tokens: list[str] = _tokenize(old)
+    new_tokens: list[str] = _tokenize(new)
+    matcher: difflib.SequenceMatcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    return [[i1, i2, ''.join(new_tokens[j1:j2])]
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def _apply(text: str, delta: list[list]) -> str:
+    tokens: list[str] = _tokenize(text)
+    # applied back to front, so the positions of the earlier changes stay valid
+    for start, end, replacement in reversed(delta):
+        tokens[start:end] = [replacement]
+    return ''.join(tokens)
+
+
+def version_count(bill_number: int) -> int:
+    return len(_load(bill_number))
+
+
+def get_timestamp(bill_number: int, version: int) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(_load(bill_number)[version]["time"])
+
+
+def get_version(bill_number: int, version: int) -> str:
+    """
+    Rebuilds a version from the closest full text before it.
+    """
+    versions: list[dict] = _load(bill_number)
+    start: int = version - version % _full_interval
+    text: str = versions[start]["text"]
+    for delta_version in versions[start + 1:version + 1]:
+        text = _apply(text, delta_version["delta"])
+    return text
+
+
+def add_version(bill_number: int, text: str) -> int:
+    """
+    Stores a new wording of a bill. Returns its version number.
+    """
+    versions: list[dict] = _load(bill_number)
+    version: dict = {"time": datetime.datetime.utcnow().isoformat()}
+    if len(versions) % _full_interval == 0:
+        version["text"] = text
+    else:
+        version["delta"] = _delta(get_version(bill_number, len(versions) - 1), text)
+    versions.append(version)
+
+    os.makedirs(_directory, exist_ok=True)
+    storage.write_json(_path(bill_number), versions)
+    return len(versions) - 1
+
+
+def diff(bill_number: int, old_version: int, new_version: int) -> str:
+    return '\n'.join(difflib.unified_diff(get_version(bill_number, old_version).splitlines(),
+                                          get_version(bill_number, new_version).splitlines(),
+                                          f"version {old_version}", f"version {new_version}", lineterm=''))
@@ -0,0 +1,240 @@
+import sys
+
+from disnake import Message
+
+import bill_parser
+import storage
+from vars import channels, emojis, roles
+
+this = sys.modules[__name__]
+
+KIND_BILL: str = "bill"
+KIND_AMENDMENT: str = "amendment"
+KIND_OPTION: str = "option"
+
+STATUS_OPEN: str = "open"
+STATUS_CLOSED: str = "closed"  # closed before the registry existed, passed or failed is unknown
+STATUS_PASSED: str = "passed"
+STATUS_FAILED: str = "failed"
+STATUS_VETOED: str = "vetoed"
+STATUS_FORCED: str = "forced"
+STATUS_VOID: str = "void"
+STATUS_WITHDRAWN: str = "withdrawn"
+
+_file: str = "bills.json"
+_bills: dict = {}
+_by_message: dict[int, int] = {}
+# bill number -> numbers of its amendments
+_children: dict[int, list[int]] = {}
+_backfilled: bool = False
+_dirty: bool = False
+
+
+class BillRecord:
+    """
+    A bill, amendment or option bill posted in #senatorial-voting.
+    """
+
+    def __init__(self, number: int, message_id: int, channel_id: int, author_id: int | None, kind: str = KIND_BILL,
+                 parent: int | None = None, status: str = STATUS_OPEN):
+        self.number: int = number
+        self.message_id: int = message_id
+        self.channel_id: int = channel_id
+        self.author_id: int | None = author_id
+        self.kind: str = kind
+        self.parent: int | None = parent
+        self.status: str = status
+
+    def is_open(self) -> bool:
+        return self.status == STATUS_OPEN
+
+    def to_json(self) -> dict:
+        return {
+            "number": self.number,
+            "message": str(self.message_id),
+            "channel": str(self.channel_id),
+            "author": None if self.author_id is None else str(self.author_id),
+            "kind": self.kind,
+            "parent": self.parent,
+            "status": self.status
+        }
+
+
+def from_json(json_data: dict) -> BillRecord:
+    return BillRecord(json_data["number"], int(json_data["message"]), int(json_data["channel"]),
+                      None if json_data["author"] is None else int(json_data["author"]),
+                      json_data["kind"], json_data["parent"], json_data["status"])
+
+
+def _status_from_reactions(message: Message) -> str:
+    reacted = [reaction.emoji for reaction in message.reactions if reaction.me]
+    if emojis.void in reacted:
+        return STATUS_VOID
+    if emojis.withdrawn in reacted:
+        return STATUS_WITHDRAWN
+    if emojis.imperial_authority in reacted:
+        return STATUS_VETOED
+    if emojis.imperial_mandate in reacted:
+        return STATUS_FORCED
+    if emojis.bill_closed in reacted:
+        return STATUS_CLOSED
+    return STATUS_OPEN
+
+
+def _record_from_message(message: Message) -> BillRecord | None:
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(message)
+    if parsed is None or not parsed.mentions(roles.senator):
+        return None
+    if parsed.is_amendment():
+        kind = KIND_AMENDMENT
+    elif any(reaction.emoji == emojis.one for reaction in message.reactions):
+        kind = KIND_OPTION
+    else:
+        kind = KIND_BILL
+    return BillRecord(parsed.number, message.id, message.channel.id, parsed.author_id, kind, parsed.parent,
+                      _status_from_reactions(message))
+
+
+def _add(record: BillRecord) -> None:
+    _discard(record.number)
+    _bills[record.number] = record
+    _by_message[record.message_id] = record.number
+    if record.parent is not None:
+        _children.setdefault(record.parent, []).append(record.number)
+
+
+def _discard(number: int) -> None:
+    old: BillRecord | None = _bills.pop(number, None)
+    if old is None:
+        return
+    _by_message.pop(old.message_id, None)
+    if old.parent is not None and number in _children.get(old.parent, []):
+        _children[old.parent].remove(number)
+
+
+def get_bill(number: int) -> BillRecord | None:
+    return _bills.get(number)
+
+
+def get_bill_by_message(message_id: int) -> BillRecord | None:
+    number: int | None = _by_message.get(message_id)
+    return None if number is None else _bills[number]
+
+
+def get_amendments(number: int) -> list[BillRecord]:
+    return [_bills[child] for child in sorted(_children.get(number, []))]
+
+
+def get_all_bills() -> list[BillRecord]:
+    return list(_bills.values())
+
+
+def get_bills_by_status(status: str) -> list[BillRecord]:
+    return [record for record in _bills.values() if record.status == status]
+
+
+def is_backfilled() -> bool:
+    return _backfilled
+
+
+def register_bill(message: Message, number: int, author_id: int | None, kind: str = KIND_BILL,
+                  parent: int | None = None) -> BillRecord:
+    """
+    Adds a freshly posted bill to the registry. The file is written by write_bills.
+    """
+    record: BillRecord = BillRecord(number, message.id, message.channel.id, author_id, kind, parent)
+    _add(record)
+    this._dirty = True
+    return record
+
+
+def register_message(message: Message) -> BillRecord | None:
+    """
+    Adds a bill found in the channel history to the registry, if the message is a bill.
+    """
+    record: BillRecord | None = _record_from_message(message)
+    if record is not None:
+        _add(record)
+        this._dirty = True
+    return record
+
+
+def set_status(number: int, status: str) -> None:
+    record: BillRecord | None = _bills.get(number)
+    if record is None or record.status == status:
+        return
+    record.status = status
+    this._dirty = True
+
+
+def update_message(message_id: int, content: str) -> None:
+    """
+    Keeps a registered bill in sync with an edit of its message.
+    """
+    record: BillRecord | None = get_bill_by_message(message_id)
+    if record is None:
+        return
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(content)
+    if parsed is None:
+        remove_message(message_id)
+        return
+    _discard(record.number)
+    record.number = parsed.number
+    record.parent = parsed.parent
+    record.author_id = parsed.author_id
+    _add(record)
+    this._dirty = True
+
+
+def remove_message(message_id: int) -> None:
+    number: int | None = _by_message.get(message_id)
+    if number is None:
+        return
+    _discard(number)
+    this._dirty = True
+
+
+def write_bills() -> None:
+    """
+    Writes the registry to the file, if anything changed since the last write.
+    """
+    if not _dirty:
+        return
+    storage.write_json(_file, {
+        "backfilled": _backfilled,
+        "bills": [record.to_json() for record in _bills.values()]
+    })
+    this._dirty = False
+
+
+def init_bills() -> None:
+    """
+    Reads the registry from the file.
+    """
+    bills_json: dict = storage.read_json(_file, {"backfilled": False, "bills": []})
+    _bills.clear()
+    _by_message.clear()
+    _children.clear()
+    for record_json in bills_json["bills"]:
+        _add(from_json(record_json))
+    this._backfilled = bills_json["backfilled"]
+    this._dirty = False
+
+
+async def backfill() -> None:
+    """
+    Fills the registry once from the #senatorial-voting history.
+    Bills registered by commands in the meantime take precedence.
+    """
+    if _backfilled:
+        return
+
+    registered: set[int] = set(_bills)
+    async for message in channels.get_senatorial_voting().history(limit=None, oldest_first=True):
+        record: BillRecord | None = _record_from_message(message)
+        if record is not None and record.number not in registered:
+            _add(record)
+
+    this._backfilled = True
+    this._dirty = True
+    write_bills()
@@ -0,0 +1,63 @@
+import asyncio
+import copy
+
+import storage
+
+_file: str = "conclusions.json"
+_journal: dict[str, dict] = {}
+# one write at a time, so an older journal never replaces a newer one
+_write_lock: asyncio.Lock = asyncio.Lock()
+
+
+def _key(bill_number: int, action: str) -> str:
+    return f"{bill_number}:{action}"
+
+
+def get_entry(bill_number: int, action: str) -> dict | None:
+    """
+    Returns the unfinished conclusion of a bill, None if there is none.
+    """
+    return _journal.get(_key(bill_number, action))
+
+
+async def start(bill_number: int, action: str, comment: str) -> dict:
+    """
+    Records that a bill is about to be concluded.
+    """
+    entry: dict = {"bill": bill_number, "action": action, "comment": comment, "done": []}
+    _journal[_key(bill_number, action)] = entry
+    await write_conclusions()
+    return entry
+
+
+async def mark_done(bill_number: int, action: str, steps: list[str]) -> None:
+    """
+    Records the finished steps of a conclusion, so a retry does not repeat them.
+    """
+    if not steps:
+        return
+    _journal[_key(bill_number, action)]["done"].extend(steps)
+    await write_conclusions()
+
+
+async def finish(bill_number: int, action: str) -> None:
+    _journal.pop(_key(bill_number, action), None)
+    await write_conclusions()
+
+
+async def write_conclusions() -> None:
+    """
+    Writes the journal to the file in a thread. The journal has to be on disk before the next step runs, so it is
+    not batched.
+    """
+    async with _write_lock:
+        await asyncio.to_thread(storage.write_json, _file, copy.deepcopy(list(_journal.values())))
+
+
+def init_conclusions() -> None:
+    """
+    Reads the journal from the file.
+    """
+    _journal.clear()
+    for entry in storage.read_json(_file, []):
+        _journal[_key(entry["bill"], entry["action"])] = entry
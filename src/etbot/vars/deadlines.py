@@ -0,0 +1,85 @@
+import asyncio
+import heapq
+import time
+
+import storage
+
+ACTION_SUMMARY: str = "summary"
+ACTION_FAIL: str = "fail"
+
+_file: str = "deadlines.json"
+# bill number -> (due timestamp, action), the heap may hold outdated entries that are skipped when popped
+_deadlines: dict[int, tuple[float, str]] = {}
+_heap: list[tuple[float, int]] = []
+# set whenever the earliest deadline might have changed, wakes up the scheduler
+changed: asyncio.Event = asyncio.Event()
+# one write at a time, so older deadlines never replace newer ones
+_write_lock: asyncio.Lock = asyncio.Lock()
+
+
+def get_deadline(bill_number: int) -> tuple[float, str] | None:
+    return _deadlines.get(bill_number)
+
+
+async def set_deadline(bill_number: int, due: float, action: str) -> None:
+    _deadlines[bill_number] = (due, action)
+    heapq.heappush(_heap, (due, bill_number))
+    changed.set()
+    await write_deadlines()
+
+
+async def remove_deadline(bill_number: int) -> None:
+    if _deadlines.pop(bill_number, None) is None:
+        return
+    changed.set()
+    await write_deadlines()
+
+
+def next_due() -> float | None:
+    """
+    Returns the earliest deadline, dropping outdated heap entries on the way.
+    """
+    while _heap:
+        due, bill_number = _heap[0]
+        if _deadlines.get(bill_number, (None,))[0] == due:
+            return due
+        heapq.heappop(_heap)
+    return None
+
+
+async def pop_due(now: float) -> list[tuple[int, str]]:
+    """
+    Removes and returns every deadline that is due.
+    """
+    due_bills: list[tuple[int, str]] = []
+    while (due := next_due()) is not None and due <= now:
+        _, bill_number = heapq.heappop(_heap)
+        due_bills.append((bill_number, _deadlines.pop(bill_number)[1]))
+    if due_bills:
+        await write_deadlines()
+    return due_bills
+
+
+def now() -> float:
+    return time.time()
+
+
+async def write_deadlines() -> None:
+    """
+    Writes the deadlines to the file in a thread.
+    """
+    async with _write_lock:
+        await asyncio.to_thread(storage.write_json, _file, [{"bill": bill_number, "due": due, "action": action}
+                                                            for bill_number, (due, action) in _deadlines.items()])
+
+
+def init_deadlines() -> None:
+    """
+    Reads the deadlines from the file.
+    """
+    _deadlines.clear()
+    for deadline in storage.read_json(_file, []):
+        _deadlines[deadline["bill"]] = (deadline["due"], deadline["action"])
+    _heap[:] = [(due, bill_number) for bill_number, (due, _) in _deadlines.items()]
+    heapq.heapify(_heap)
+    changed.set()
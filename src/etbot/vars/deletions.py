@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import sys
+import time
+
+import database
+import storage
+
+this = sys.modules[__name__]
+
+_settings_file: str = "deletions.json"
+# seconds until a message is deleted, if its channel has no delay of its own
+_default_delay: float = 60 * 60
+
+# channel id -> delay in seconds
+_delays: dict[int, float] = {}
+# the earliest due time the scheduler knows of, the schedule itself stays on disk
+_next_due: float | None = None
+# set whenever a deletion is due before the scheduler would wake up
+changed: asyncio.Event = asyncio.Event()
+
+
+def _create(connection: sqlite3.Connection) -> None:
+    connection.execute("CREATE TABLE IF NOT EXISTS deletions ("
+                       "message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, due REAL NOT NULL)")
+    connection.execute("CREATE INDEX IF NOT EXISTS deletions_due ON deletions (due)")
+
+
+_database: database.Database = database.Database("deletions.db", _create)
+
+
+def now() -> float:
+    return time.time()
+
+
+def get_delay(channel_id: int) -> float:
+    return _delays.get(channel_id, _default_delay)
+
+
+def set_delay(channel_id: int, delay: float) -> None:
+    _delays[channel_id] = delay
+    storage.write_json(_settings_file, {str(key): value for key, value in _delays.items()})
+
+
+async def schedule(message_id: int, channel_id: int) -> None:
+    """
+    Deletes a message once its channel's delay has passed, even if the bot restarts in between.
+    """
+    due: float = now() + get_delay(channel_id)
+    await _database.run(lambda connection: connection.execute(
+        "INSERT OR REPLACE INTO deletions (message_id, channel_id, due) VALUES (?, ?, ?)",
+        (message_id, channel_id, due)))
+    if _next_due is None or due < _next_due:
+        this._next_due = due
+        changed.set()
+
+
+async def cancel(message_ids: list[int]) -> None:
+    await _database.run(lambda connection: connection.executemany(
+        "DELETE FROM deletions WHERE message_id = ?", [(message_id,) for message_id in message_ids]))
+
+
+async def next_due() -> float | None:
+    """
+    Returns the earliest due time, straight from the index on the due times.
+    """
+    this._next_due = await _database.run(lambda connection: connection.execute(
+        "SELECT MIN(due) FROM deletions").fetchone()[0])
+    return _next_due
+
+
+async def get_due(limit: int = 1000) -> dict[int, list[int]]:
+    """
+    Returns the due messages by channel, at most limit of them.
+    """
+    rows: list[tuple[int, int]] = await _database.run(lambda connection: connection.execute(
+        "SELECT message_id, channel_id FROM deletions WHERE due <= ? ORDER BY due LIMIT ?",
+        (now(), limit)).fetchall())
+    due: dict[int, list[int]] = {}
+    for message_id, channel_id in rows:
+        due.setdefault(channel_id, []).append(message_id)
+    return due
+
+
+def init_deletions() -> None:
+    """
+    Reads the channel delays from the file.
+    """
+    _delays.clear()
+    for channel_id, delay in storage.read_json(_settings_file, {}).items():
+        _delays[int(channel_id)] = delay
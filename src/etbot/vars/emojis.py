@@ -10,7 +10,7 @@ abstain_vote = None
 recycle = '♻'
 ear_with_hearing_aid = '🦻'
 one, two, three, four, five, six, seven, eight, nine, ten = '1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟'
-options = [None, None, None, None, None, None]
+options = [None, None, None, None, None, None, None, None, None, None]
 bill_closed = None
 void = None
 withdrawn = None
@@ -22,7 +22,7 @@ def initialize_testing_emojis(bot: commands.Bot):
     this.yes_vote = bot.get_emoji(867869297329176587)
     this.no_vote = bot.get_emoji(867869349041799198)
     this.abstain_vote = bot.get_emoji(867869367601070081)
-    this.options = [one, two, three, four, five, six]
+    this.options = [one, two, three, four, five, six, seven, eight, nine, ten]
     this.bill_closed = bot.get_emoji(942907452360380457)
     this.void = bot.get_emoji(942907470207131658)
     this.withdrawn = bot.get_emoji(943070133193179167)
@@ -34,7 +34,7 @@ def initialize_emojis(bot: commands.Bot):
     this.yes_vote = bot.get_emoji(698226023795261451)
     this.no_vote = bot.get_emoji(698226052899799130)
     this.abstain_vote = bot.get_emoji(698226077113516118)
-    this.options = [one, two, three, four, five, six]
+    this.options = [one, two, three, four, five, six, seven, eight, nine, ten]
     this.bill_closed = bot.get_emoji(698468221929521222)
     this.void = bot.get_emoji(868451496595951656)
     this.withdrawn = bot.get_emoji(750073205389262908)
@@ -1,25 +1,51 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import storage
+
+this = sys.modules[__name__]
+
+_file: str = "index.txt"
+_index: int | None = None
+# serialises every change of the index, so no number is handed out twice
+_lock: asyncio.Lock = asyncio.Lock()
+
+
 # returns the index from the file
 def get_index_from_file() -> int:
-    with open("index.txt", 'r', encoding="utf8") as file:
-        number = file.read()
+    try:
+        with open(_file, 'r', encoding="utf8") as file:
+            number = file.read()
+    except FileNotFoundError:
+        return 0
     return int(number)
 
 
-_index: int = get_index_from_file()
+def get_index() -> int:
+    if _index is None:
+        this._index = get_index_from_file()
+    return _index
 
 
-def get_index() -> int: return _index
+async def _commit(index: int) -> None:
+    await asyncio.to_thread(storage.write_text, _file, str(index))
+    this._index = index
 
 
-def increment_index() -> None:
-    global _index
-    _index += 1
-    with open("index.txt", 'w', encoding="utf8") as file:
-        file.write(str(_index))
+@asynccontextmanager
+async def reserve() -> AsyncIterator[int]:
+    """
+    Reserves the next bill number for the duration of the block.
+    The number is committed when the block finishes and rolled back if it raises, so a failed post does not use it up.
+    """
+    async with _lock:
+        index: int = get_index() + 1
+        yield index
+        await _commit(index)
 
 
-def set_index(index: int) -> None:
-    global _index
-    _index = index
-    with open("index.txt", 'w', encoding="utf8") as file:
-        file.write(str(_index))
+async def set_index(index: int) -> None:
+    async with _lock:
+        await _commit(index)
@@ -0,0 +1,250 @@
+import bisect
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from vars import warnings
+
+this = sys.modules[__name__]
+
+WARN: str = "warn"
+DELETE_WARNING: str = "delete warning"
+EXPIRE_WARNING: str = "expire warning"
+PURGE: str = "purge"
+SAVE: str = "save"
+SETTINGS: str = "settings"
+
+_directory: str = "ledger"
+# entries per segment before a new one is started
+_segment_size: int = 1000
+_segment_pattern: re.Pattern = re.compile(r"^(\d{4}-\d{2})-(\d+)\.jsonl$")
+_archive_pattern: re.Pattern = re.compile(r"^(\d{4}-\d{2})\.jsonl\.gz$")
+
+# appends run in order on a single thread, so they never block the event loop
+_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+# the entries in the order they were recorded, which is also the order of their times, and indexed by user
+_entries: list["LedgerEntry"] = []
+_by_target: dict[int, list["LedgerEntry"]] = {}
+_by_moderator: dict[int, list["LedgerEntry"]] = {}
+_segment: str | None = None
+_segment_entries: int = 0
+
+
+class LedgerEntry:
+    """
+    A moderation action.
+    """
+
+    __slots__ = ("time", "action", "moderator_id", "target_id", "details")
+
+    def __init__(self, time: float, action: str, moderator_id: int | None, target_id: int | None, details: dict):
+        self.time: float = time
+        self.action: str = action
+        self.moderator_id: int | None = moderator_id
+        self.target_id: int | None = target_id
+        self.details: dict = details
+
+    def __str__(self):
+        time: str = datetime.datetime.utcfromtimestamp(self.time).strftime('%Y-%m-%d %H:%M')
+        moderator: str = "" if self.moderator_id is None else f" by {warnings.get_name(self.moderator_id)}"
+        details: str = ', '.join(f"{key}: {value}" for key, value in self.details.items() if key != "warning")
+        if "warning" in self.details:
+            details = f"{self.details['warning'][2]}{', ' + details if details else ''}"
+        return f"{time} **{self.action}**{moderator}{' - ' + details if details else ''}"
+
+    def to_json(self) -> dict:
+        return {
+            "time": self.time,
+            "action": self.action,
+            "moderator": None if self.moderator_id is None else str(self.moderator_id),
+            "target": None if self.target_id is None else str(self.target_id),
+            "details": self.details
+        }
+
+
+def from_json(json_data: dict) -> LedgerEntry:
+    return LedgerEntry(json_data["time"], json_data["action"],
+                       None if json_data["moderator"] is None else int(json_data["moderator"]),
+                       None if json_data["target"] is None else int(json_data["target"]), json_data["details"])
+
+
+def _timestamp(time: datetime.datetime) -> float:
+    """
+    Returns the timestamp of a naive utc time, as used throughout the bot.
+    """
+    return time.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _report(future: Future) -> None:
+    if future.exception() is not None:
+        logging.error("Writing the moderation ledger failed", exc_info=future.exception())
+
+
+def _append(path: str, line: str) -> None:
+    os.makedirs(_directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(line)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _index(entry: LedgerEntry) -> None:
+    _entries.append(entry)
+    if entry.target_id is not None:
+        _by_target.setdefault(entry.target_id, []).append(entry)
+    if entry.moderator_id is not None:
+        _by_moderator.setdefault(entry.moderator_id, []).append(entry)
+
+
+def record(action: str, moderator_id: int | None, target_id: int | None, **details: Any) -> LedgerEntry:
+    """
+    Appends an action to the ledger.
+    """
+    now: datetime.datetime = datetime.datetime.utcnow()
+    # times never go backwards, so the entries stay sorted even if the clock does
+    time: float = max(_timestamp(now), _entries[-1].time if _entries else 0)
+    entry: LedgerEntry = LedgerEntry(time, action, moderator_id, target_id, details)
+    _index(entry)
+
+    month: str = now.strftime("%Y-%m")
+    current: re.Match | None = None if _segment is None else _segment_pattern.match(os.path.basename(_segment))
+    if current is None or current.group(1) != month or _segment_entries >= _segment_size:
+        number: int = int(current.group(2)) + 1 if current is not None and current.group(1) == month \
+            else _next_segment_number(month)
+        this._segment = os.path.join(_directory, f"{month}-{number}.jsonl")
+        this._segment_entries = 0
+    this._segment_entries += 1
+    _executor.submit(_append, _segment, json.dumps(entry.to_json()) + "\n").add_done_callback(_report)
+    return entry
+
+
+def record_warning(action: str, moderator_id: int | None, warning: warnings.DiscordWarning) -> LedgerEntry:
+    return record(action, moderator_id, warning.user_id, warning=list(warning.to_row()))
+
+
+def _next_segment_number(month: str) -> int:
+    numbers: list[int] = [int(match.group(2)) for match in map(_segment_pattern.match, _list())
+                          if match is not None and match.group(1) == month]
+    return max(numbers, default=0) + 1
+
+
+def _list() -> list[str]:
+    return os.listdir(_directory) if os.path.isdir(_directory) else []
+
+
+def get_by_target(target_id: int) -> list[LedgerEntry]:
+    return list(_by_target.get(target_id, []))
+
+
+def get_by_moderator(moderator_id: int) -> list[LedgerEntry]:
+    return list(_by_moderator.get(moderator_id, []))
+
+
+def get_between(after: datetime.datetime, before: datetime.datetime) -> list[LedgerEntry]:
+    """
+    Returns the entries recorded in a time range, found by bisecting the time ordered entries.
+    """
+    start: int = bisect.bisect_left(_entries, _timestamp(after), key=lambda entry: entry.time)
+    end: int = bisect.bisect_left(_entries, _timestamp(before), key=lambda entry: entry.time)
+    return _entries[start:end]
+
+
+def replay_warnings(until: datetime.datetime | None = None) -> list[warnings.DiscordWarning]:
+    """
+    Rebuilds the warnings that were active at a time, now by default, from the ledger alone.
+    """
+    until = datetime.datetime.utcnow() if until is None else until
+    active: dict[str, warnings.DiscordWarning] = {}
+    for entry in _entries[:bisect.bisect_right(_entries, _timestamp(until), key=lambda entry: entry.time)]:
+        if "warning" not in entry.details:
+            continue
+        warning: warnings.DiscordWarning = warnings.from_row(tuple(entry.details["warning"]))
+        if entry.action == WARN:
+            active[str(warning.id)] = warning
+        elif entry.action in [DELETE_WARNING, EXPIRE_WARNING]:
+            active.pop(str(warning.id), None)
+    return [warning for warning in active.values() if warning.expires >= until]
+
+
+def is_empty() -> bool:
+    return not _entries
+
+
+def _compact(current_month: str) -> int:
+    """
+    Merges the segments of every finished month into one compressed file. Returns the number of merged segments.
+    """
+    segments: dict[str, list[tuple[int, str]]] = {}
+    for name in _list():
+        match: re.Match | None = _segment_pattern.match(name)
+        if match is not None and match.group(1) < current_month:
+            segments.setdefault(match.group(1), []).append((int(match.group(2)), name))
+
+    merged: int = 0
+    for month, names in segments.items():
+        archive: str = os.path.join(_directory, f"{month}.jsonl.gz")
+        lines: list[str] = _read(f"{month}.jsonl.gz") if os.path.exists(archive) else []
+        for _, name in sorted(names):
+            lines += _read(name)
+        # the segments are only removed once the archive replaced the old one, a crash in between leaves lines that
+        # are in both, which reading the ledger skips
+        with gzip.open(archive + ".tmp", "wt", encoding="utf-8") as file:
+            file.writelines(dict.fromkeys(lines))
+        os.replace(archive + ".tmp", archive)
+        for _, name in names:
+            os.remove(os.path.join(_directory, name))
+        merged += len(names)
+    return merged
+
+
+def compact() -> Future:
+    """
+    Compacts the ledger in the background, after the appends submitted so far.
+    """
+    future: Future = _executor.submit(_compact, datetime.datetime.utcnow().strftime("%Y-%m"))
+    future.add_done_callback(_report)
+    return future
+
+
+def _read(name: str) -> list[str]:
+    path: str = os.path.join(_directory, name)
+    opener: Callable = gzip.open if name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        return file.readlines()
+
+
+def init_ledger() -> None:
+    """
+    Reads the ledger from its segments and builds the indexes.
+    """
+    _entries.clear()
+    _by_target.clear()
+    _by_moderator.clear()
+
+    def order(name: str) -> tuple[str, int]:
+        match: re.Match | None = _segment_pattern.match(name)
+        # a month's compressed file holds the segments before any that are still uncompressed
+        return (match.group(1), int(match.group(2))) if match is not None \
+            else (_archive_pattern.match(name).group(1), 0)
+
+    names: list[str] = sorted((name for name in _list()
+                               if _segment_pattern.match(name) or _archive_pattern.match(name)), key=order)
+    # lines of a month that are in its compressed file and a segment after an interrupted compaction are read once
+    month: str | None = None
+    seen: set[str] = set()
+    for name in names:
+        if order(name)[0] != month:
+            month = order(name)[0]
+            seen.clear()
+        for line in _read(name):
+            if not line.strip() or line in seen:
+                continue
+            seen.add(line)
+            _index(from_json(json.loads(line)))
+    this._segment = None
@@ -0,0 +1,91 @@
+import logging
+import sys
+import time
+from typing import Awaitable, Callable
+
+from disnake import Message
+from disnake.abc import GuildChannel
+
+this = sys.modules[__name__]
+
+Handler = Callable[[Message], Awaitable[None]]
+
+# owner (usually a cog) -> (handler, getters of the channels it handles, none for every channel)
+_registrations: dict[str, list[tuple[Handler, tuple[Callable[[], GuildChannel], ...]]]] = {}
+# channel id -> handlers, rebuilt as a whole whenever the registrations change after the channels are initialized
+_routes: dict[int, tuple[Handler, ...]] = {}
+# the handlers of every other channel
+_everywhere: tuple[Handler, ...] = ()
+_built: bool = False
+# handler name -> [calls, total seconds, slowest call in seconds]
+_timings: dict[str, list[float]] = {}
+
+
+def register(owner: str, handler: Handler, *channels: Callable[[], GuildChannel]) -> None:
+    """
+    Routes the messages of the channels, given by their getters from vars.channels, to a handler.
+    Without channels the handler gets the messages of every channel.
+    """
+    _registrations.setdefault(owner, []).append((handler, channels))
+    if _built:
+        build()
+
+
+def unregister(owner: str) -> None:
+    if _registrations.pop(owner, None) is not None and _built:
+        build()
+
+
+def build() -> None:
+    """
+    Resolves the channels of all registrations into the routing table. Needs the channels to be initialized.
+    """
+    everywhere: list[Handler] = []
+    routes: dict[int, list[Handler]] = {}
+    for registrations in _registrations.values():
+        for handler, getters in registrations:
+            if not getters:
+                everywhere.append(handler)
+            for getter in getters:
+                try:
+                    routes.setdefault(getter().id, []).append(handler)
+                except Exception as exception:
+                    logging.warning(f"Not routing messages to {_name(handler)}: {exception}")
+
+    # the handlers of every channel are part of each route, so dispatching stays a single lookup
+    this._routes = {channel_id: tuple(everywhere + handlers) for channel_id, handlers in routes.items()}
+    this._everywhere = tuple(everywhere)
+    this._built = True
+
+
+def _name(handler: Handler) -> str:
+    return getattr(handler, "__qualname__", repr(handler))
+
+
+async def dispatch(message: Message) -> None:
+    """
+    Passes a message to the handlers of its channel and counts how long each of them takes.
+    """
+    for handler in _routes.get(message.channel.id, _everywhere):
+        start: float = time.perf_counter()
+        try:
+            await handler(message)
+        except Exception:
+            logging.exception(f"{_name(handler)} failed on message {message.id}")
+        elapsed: float = time.perf_counter() - start
+
+        timing: list[float] = _timings.setdefault(_name(handler), [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        timing[2] = max(timing[2], elapsed)
+
+
+def get_routes() -> dict[int, tuple[Handler, ...]]:
+    return dict(_routes)
+
+
+def get_timings() -> dict[str, tuple[int, float, float]]:
+    """
+    Returns the number of calls, the total and the slowest time in seconds of every handler.
+    """
+    return {name: (int(calls), total, slowest) for name, (calls, total, slowest) in _timings.items()}
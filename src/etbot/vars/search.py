@@ -0,0 +1,151 @@
+import math
+import re
+import sys
+
+import bill_parser
+import storage
+from vars import channels
+
+this = sys.modules[__name__]
+
+_file: str = "search.json"
+_token_pattern: re.Pattern = re.compile(r"[a-z0-9]+")
+_suffixes: tuple[str, ...] = ("ations", "ation", "ings", "ing", "ies", "ied", "ed", "es", "ly", "s")
+_stop_words: set[str] = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+                         "or", "that", "the", "this", "to", "was", "will", "with"}
+# term -> bill number -> term frequency
+_postings: dict[str, dict[int, int]] = {}
+# bill number -> terms of the indexed text, needed to remove a bill before reindexing it
+_documents: dict[int, dict[str, int]] = {}
+_lengths: dict[int, int] = {}
+_total_length: int = 0
+_backfilled: bool = False
+_dirty: bool = False
+stemming: bool = True
+
+
+def stem(token: str) -> str:
+    """
+    Strips common english suffixes, a rough but fast stand-in for a real stemmer.
+    """
+    for suffix in _suffixes:
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = [token for token in _token_pattern.findall(text.lower()) if token not in _stop_words]
+    return [stem(token) for token in tokens] if stemming else tokens
+
+
+def _remove(bill_number: int) -> None:
+    this._total_length -= _lengths.pop(bill_number, 0)
+    for term in _documents.pop(bill_number, {}):
+        postings: dict[int, int] = _postings[term]
+        del postings[bill_number]
+        if not postings:
+            del _postings[term]
+
+
+def _add(bill_number: int, text: str) -> None:
+    _remove(bill_number)
+    terms: dict[str, int] = {}
+    for token in tokenize(text):
+        terms[token] = terms.get(token, 0) + 1
+    _insert(bill_number, terms)
+
+
+def _insert(bill_number: int, terms: dict[str, int]) -> None:
+    _documents[bill_number] = terms
+    _lengths[bill_number] = sum(terms.values())
+    this._total_length += _lengths[bill_number]
+    for term, frequency in terms.items():
+        _postings.setdefault(term, {})[bill_number] = frequency
+
+
+def index_bill(bill_number: int, text: str) -> None:
+    """
+    Adds a bill to the index or replaces its previously indexed text. The file is written by write_search.
+    """
+    _add(bill_number, text)
+    this._dirty = True
+
+
+def remove_bill(bill_number: int) -> None:
+    if bill_number not in _documents:
+        return
+    _remove(bill_number)
+    this._dirty = True
+
+
+def search(terms: str, limit: int = 10) -> list[tuple[int, float]]:
+    """
+    Returns the best matching bill numbers with their BM25 score.
+    """
+    documents: int = len(_documents)
+    if documents == 0:
+        return []
+    average_length: float = max(_total_length / documents, 1)
+
+    scores: dict[int, float] = {}
+    for term in set(tokenize(terms)):
+        postings: dict[int, int] | None = _postings.get(term)
+        if postings is None:
+            continue
+        idf: float = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+        for bill_number, frequency in postings.items():
+            length: int = _lengths[bill_number]
+            scores[bill_number] = scores.get(bill_number, 0) + \
+                idf * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * length / average_length))
+
+    return sorted(scores.items(), key=lambda score: score[1], reverse=True)[:limit]
+
+
+async def backfill() -> None:
+    """
+    Indexes the bills in #passed-bills and #senatorial-voting once. Bills indexed in the meantime take precedence.
+    """
+    if _backfilled:
+        return
+
+    indexed: set[int] = set(_documents)
+    # #senatorial-voting comes last, so its possibly edited wording wins
+    for channel in [channels.get_passed_bills(), channels.get_senatorial_voting()]:
+        async for message in channel.history(limit=None, oldest_first=True):
+            parsed: bill_parser.ParsedBill | None = bill_parser.parse_message(message)
+            if parsed is not None and parsed.number not in indexed:
+                _add(parsed.number, parsed.body)
+
+    this._backfilled = True
+    this._dirty = True
+    write_search()
+
+
+def write_search() -> None:
+    """
+    Writes the index to the file, if anything changed since the last write.
+    Only the documents are stored, the postings are rebuilt from them.
+    """
+    if not _dirty:
+        return
+    storage.write_json(_file, {
+        "backfilled": _backfilled,
+        "documents": {str(bill_number): terms for bill_number, terms in _documents.items()}
+    })
+    this._dirty = False
+
+
+def init_search() -> None:
+    """
+    Reads the index from the file.
+    """
+    search_json: dict = storage.read_json(_file, {"backfilled": False, "documents": {}})
+    _postings.clear()
+    _documents.clear()
+    _lengths.clear()
+    this._total_length = 0
+    for bill_number, terms in search_json["documents"].items():
+        _insert(int(bill_number), terms)
+    this._backfilled = search_json["backfilled"]
+    this._dirty = False
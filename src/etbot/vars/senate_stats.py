@@ -0,0 +1,152 @@
+import datetime
+import re
+import sys
+
+from disnake.utils import snowflake_time
+
+import storage
+from vars import bills, tallies
+
+this = sys.modules[__name__]
+
+PROPOSED: str = "proposed"
+VOTES: str = "votes"
+VOTED: str = "voted"
+ALL: str = "all"
+
+_file: str = "senate_stats.json"
+# statistics of an older version of the file are counted again by the backfill, version 1 bucketed conclusions by
+# the month they happened in
+_version: int = 2
+# senator id or "all" -> month ("YYYY-MM") or "all" -> counter -> value, every bill counts for the month it was proposed
+_stats: dict[str, dict[str, dict[str, int]]] = {}
+_backfilled: bool = False
+_dirty: bool = False
+
+
+def _month(message_id: int) -> str:
+    return snowflake_time(message_id).strftime("%Y-%m")
+
+
+def _add(senator_id: int | None, message_id: int, counter: str, amount: int = 1) -> None:
+    senators: list[str] = [ALL] if senator_id is None else [ALL, str(senator_id)]
+    for senator in senators:
+        for period in [ALL, _month(message_id)]:
+            counters: dict[str, int] = _stats.setdefault(senator, {}).setdefault(period, {})
+            counters[counter] = counters.get(counter, 0) + amount
+
+
+def record_proposal(senator_id: int | None, message_id: int) -> None:
+    # until the backfill ran, the registry holds the bill and the backfill counts it
+    if not _backfilled:
+        return
+    _add(senator_id, message_id, PROPOSED)
+    this._dirty = True
+
+
+def record_conclusion(senator_id: int | None, message_id: int, status: str, votes: int | None,
+                      amount: int = 1) -> None:
+    """
+    Counts a concluded bill, or takes it back again with an amount of -1, for the month its message was posted in.
+    The file is written by write_stats.
+    """
+    if not _backfilled:
+        return
+    _add(senator_id, message_id, status, amount)
+    if votes is not None:
+        _add(senator_id, message_id, VOTES, votes * amount)
+        _add(senator_id, message_id, VOTED, amount)
+    this._dirty = True
+
+
+def is_period(period: str) -> bool:
+    """
+    Returns whether a period is "all", a month like "2022-05" or the last months like "6m".
+    """
+    return period == ALL or re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", period) is not None or \
+        re.fullmatch(r"[1-9]\d*m", period) is not None
+
+
+def _months(period: str, now: datetime.datetime) -> list[str]:
+    """
+    Returns the months of a period, either "all", a month like "2022-05" or the last months like "6m".
+    """
+    if period.endswith("m") and period[:-1].isdigit():
+        months: list[str] = []
+        year, month = now.year, now.month
+        for _ in range(min(int(period[:-1]), 120)):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return months
+    return [period]
+
+
+def get_stats(senator_id: int | None = None, period: str = ALL) -> dict[str, int]:
+    """
+    Returns the counters of a senator, or of the whole senate, over a period.
+    """
+    periods: dict[str, dict[str, int]] = _stats.get(ALL if senator_id is None else str(senator_id), {})
+    totals: dict[str, int] = {}
+    for month in _months(period, datetime.datetime.utcnow()):
+        for counter, value in periods.get(month, {}).items():
+            totals[counter] = totals.get(counter, 0) + value
+    return totals
+
+
+def count_months(senator_id: int | None = None, period: str = ALL) -> int:
+    """
+    Returns the number of months in a period, for "all" the months since the first bill, quiet months included.
+    """
+    now: datetime.datetime = datetime.datetime.utcnow()
+    if period != ALL:
+        return len(_months(period, now))
+    months: list[str] = [month for month in _stats.get(ALL if senator_id is None else str(senator_id), {})
+                         if month != ALL]
+    if not months:
+        return 1
+    year, month = map(int, min(months).split("-"))
+    return max((now.year - year) * 12 + now.month - month + 1, 1)
+
+
+def backfill() -> None:
+    """
+    Counts the bills in the registry once, which has to be backfilled from the channel history already.
+    """
+    if _backfilled:
+        return
+    for record in bills.get_all_bills():
+        _add(record.author_id, record.message_id, PROPOSED)
+        if record.is_open():
+            continue
+        _add(record.author_id, record.message_id, record.status)
+        tally: dict[str, int] | None = tallies.get_tally(record.number)
+        if tally:
+            _add(record.author_id, record.message_id, VOTES, sum(tally.values()))
+            _add(record.author_id, record.message_id, VOTED)
+    this._backfilled = True
+    this._dirty = True
+    write_stats()
+
+
+def write_stats() -> None:
+    """
+    Writes the statistics to the file, if anything changed since the last write.
+    """
+    if not _dirty:
+        return
+    storage.write_json(_file, {"version": _version, "backfilled": _backfilled, "stats": _stats})
+    this._dirty = False
+
+
+def init_stats() -> None:
+    """
+    Reads the statistics from the file.
+    """
+    stats_json: dict = storage.read_json(_file, {"version": _version, "backfilled": False, "stats": {}})
+    _stats.clear()
+    this._dirty = False
+    if stats_json.get("version", 1) != _version:
+        this._backfilled = False
+        return
+    _stats.update(stats_json["stats"])
+    this._backfilled = stats_json["backfilled"]
@@ -0,0 +1,142 @@
+import sys
+
+from disnake import Message, PartialEmoji, Emoji
+
+import storage
+from vars import emojis
+
+this = sys.modules[__name__]
+
+YES: str = "yes"
+NO: str = "no"
+ABSTAIN: str = "abstain"
+OPTIONS: list[str] = [str(i) for i in range(1, 11)]
+# order in which the votes are displayed
+_order: list[str] = [YES] + OPTIONS + [NO, ABSTAIN]
+
+_file: str = "tallies.json"
+_tallies: dict[int, dict[str, int]] = {}
+_dirty: bool = False
+
+
+def vote_key(emoji: PartialEmoji | Emoji | str) -> str | None:
+    """
+    Returns the vote a reaction emoji stands for, None if it is no vote.
+    """
+    emoji_id: int | None = getattr(emoji, "id", None)
+    if emoji_id is not None:
+        if emojis.yes_vote is not None and emoji_id == emojis.yes_vote.id:
+            return YES
+        if emojis.no_vote is not None and emoji_id == emojis.no_vote.id:
+            return NO
+        if emojis.abstain_vote is not None and emoji_id == emojis.abstain_vote.id:
+            return ABSTAIN
+        return None
+
+    name: str = emoji if isinstance(emoji, str) else emoji.name
+    numbers: list[str] = [emojis.one, emojis.two, emojis.three, emojis.four, emojis.five,
+                          emojis.six, emojis.seven, emojis.eight, emojis.nine, emojis.ten]
+    if name in numbers:
+        return OPTIONS[numbers.index(name)]
+    return None
+
+
+def vote_emoji(key: str) -> Emoji | str:
+    match key:
+        case "yes":
+            return emojis.yes_vote
+        case "no":
+            return emojis.no_vote
+        case "abstain":
+            return emojis.abstain_vote
+        case _:
+            return emojis.options[int(key) - 1]
+
+
+def has_tally(bill_number: int) -> bool:
+    return bill_number in _tallies
+
+
+def get_tally(bill_number: int) -> dict[str, int] | None:
+    return _tallies.get(bill_number)
+
+
+def open_tally(bill_number: int, keys: list[str]) -> None:
+    """
+    Starts an empty tally for a freshly posted bill.
+    """
+    _tallies[bill_number] = {key: 0 for key in keys}
+    this._dirty = True
+
+
+def add_vote(bill_number: int, key: str) -> None:
+    tally: dict[str, int] | None = _tallies.get(bill_number)
+    if tally is None:
+        return
+    tally[key] = tally.get(key, 0) + 1
+    this._dirty = True
+
+
+def remove_vote(bill_number: int, key: str) -> None:
+    tally: dict[str, int] | None = _tallies.get(bill_number)
+    if tally is None or key not in tally:
+        return
+    tally[key] = max(tally[key] - 1, 0)
+    this._dirty = True
+
+
+def clear_votes(bill_number: int, key: str | None = None) -> None:
+    """
+    Resets the votes after the reactions of a bill were cleared, either all of them or only one emoji.
+    """
+    tally: dict[str, int] | None = _tallies.get(bill_number)
+    if tally is None:
+        return
+    for vote in tally:
+        if key is None or vote == key:
+            tally[vote] = 0
+    this._dirty = True
+
+
+def reconcile(bill_number: int, bill: Message) -> dict[str, int]:
+    """
+    Recounts the tally of a bill from its reactions, not counting the reactions of the bot.
+    """
+    tally: dict[str, int] = {}
+    for reaction in bill.reactions:
+        key: str | None = vote_key(reaction.emoji)
+        if key is None:
+            continue
+        tally[key] = reaction.count - (1 if reaction.me else 0)
+    _tallies[bill_number] = tally
+    this._dirty = True
+    return tally
+
+
+def format_votes(tally: dict[str, int]) -> str:
+    return "\r\n" + " | ".join(f"{tally[key]} {vote_emoji(key)}" for key in _order if key in tally)
+
+
+def format_tally(bill_number: int) -> str:
+    return format_votes(_tallies.get(bill_number, {}))
+
+
+def write_tallies() -> None:
+    """
+    Writes the tallies to the file, if anything changed since the last write.
+    """
+    if not _dirty:
+        return
+    storage.write_json(_file, {str(number): tally for number, tally in _tallies.items()})
+    this._dirty = False
+
+
+def init_tallies() -> None:
+    """
+    Reads the tallies from the file.
+    """
+    tallies_json: dict = storage.read_json(_file, {})
+    _tallies.clear()
+    for number, tally in tallies_json.items():
+        _tallies[int(number)] = tally
+    this._dirty = False
@@ -0,0 +1,111 @@
+import datetime
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+from typing import IO, Iterator
+
+import storage
+
+this = sys.modules[__name__]
+
+_settings_file: str = "transcripts.json"
+_directory: str = os.path.join("transcripts", "purges")
+# transcripts up to this size stay in memory, bigger ones spill over into a temporary file
+_spool_size: int = 8 * 1024 * 1024
+# room left for the rest of an upload request next to a part
+_upload_margin: int = 64 * 1024
+
+compress: bool = False
+# days purge transcripts are kept locally, 0 keeps none
+keep_days: int = 0
+
+
+class TranscriptWriter:
+    """
+    Encodes the text of a transcript into a spooled buffer, gzip compressed if enabled. Writing blocks, so the text is
+    rendered on the event loop and written in a thread, a chunk at a time.
+    """
+
+    def __init__(self) -> None:
+        self.buffer: IO[bytes] = tempfile.SpooledTemporaryFile(max_size=_spool_size)
+        self.stream: IO[bytes] = gzip.GzipFile(fileobj=self.buffer, mode="wb") if compress else self.buffer
+
+    def write(self, text: str) -> None:
+        self.stream.write(text.encode("utf8"))
+
+    def finish(self) -> IO[bytes]:
+        """
+        Ends the compressed stream and returns the buffer rewound to its start.
+        """
+        if self.stream is not self.buffer:
+            self.stream.close()
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def filename(name: str) -> str:
+    return f"{name}.txt.gz" if compress else f"{name}.txt"
+
+
+def split(buffer: IO[bytes], name: str, upload_limit: int) -> Iterator[tuple[str, io.BytesIO]]:
+    """
+    Yields the parts of a transcript that each fit into one upload, numbered if there is more than one.
+    The parts have to be concatenated again to read a split transcript.
+    """
+    size: int = buffer.seek(0, io.SEEK_END)
+    buffer.seek(0)
+    part_size: int = max(upload_limit - _upload_margin, 1)
+    parts: int = max((size + part_size - 1) // part_size, 1)
+    for part in range(1, parts + 1):
+        data: bytes = buffer.read(part_size)
+        yield (name if parts == 1 else f"{name}.{part:03d}"), io.BytesIO(data)
+
+
+def keep(buffer: IO[bytes], channel_id: int, name: str, time: datetime.datetime) -> None:
+    """
+    Stores a transcript under transcripts/purges/<channel id>/<date>/ and drops the ones older than keep_days.
+    Blocks while writing, so it is meant to run in a thread.
+    """
+    if keep_days <= 0:
+        return
+
+    directory: str = os.path.join(_directory, str(channel_id), time.strftime("%Y-%m-%d"))
+    os.makedirs(directory, exist_ok=True)
+    buffer.seek(0)
+    with open(os.path.join(directory, name), "wb") as file:
+        shutil.copyfileobj(buffer, file)
+    buffer.seek(0)
+
+    oldest: str = (time - datetime.timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    for channel in os.listdir(_directory):
+        for date in os.listdir(os.path.join(_directory, channel)):
+            if date < oldest:
+                shutil.rmtree(os.path.join(_directory, channel, date))
+
+
+def find_kept(channel_id: int, date: str) -> list[str]:
+    """
+    Returns the paths of the transcripts kept for a channel on a date ("YYYY-MM-DD").
+    """
+    directory: str = os.path.join(_directory, str(channel_id), date)
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+
+
+def set_settings(compressed: bool, days: int) -> None:
+    this.compress = compressed
+    this.keep_days = days
+    storage.write_json(_settings_file, {"compress": compressed, "keep_days": days})
+
+
+def init_transcripts() -> None:
+    """
+    Reads the transcript settings from the file.
+    """
+    settings: dict = storage.read_json(_settings_file, {"compress": False, "keep_days": 0})
+    this.compress = settings["compress"]
+    this.keep_days = settings["keep_days"]
@@ -1,11 +1,46 @@
+import asyncio
+import bisect
 import datetime
+import heapq
 import json
+import logging
+import os
+import sqlite3
+import sys
 import uuid
+from typing import Callable
 
-from disnake import User, Member
+from disnake import HTTPException
 from disnake.ext import commands
 
-_warnings: dict = {}
+import database
+import storage
+
+this = sys.modules[__name__]
+
+# read once on the first start and renamed afterwards, the database replaces it
+_legacy_file: str = "warnings.json"
+_names_file: str = "warning_names.json"
+# how many users are fetched at the same time while warming up the names
+_concurrent_fetches: int = 8
+_loading: asyncio.Task | None = None
+_warmup: asyncio.Task | None = None
+
+# the warnings indexed by id, by warned user and by moderator, all holding the same records
+_by_id: dict[uuid.UUID, "DiscordWarning"] = {}
+_by_user: dict[int, list["DiscordWarning"]] = {}
+_by_moderator: dict[int, list["DiscordWarning"]] = {}
+# all warnings sorted by the date they were given and by the date they expire, pages are sliced from them
+_by_given: list["DiscordWarning"] = []
+_by_expires: list["DiscordWarning"] = []
+# (expires, id), may hold outdated entries of deleted or edited warnings that are skipped when popped
+_expiry: list[tuple[datetime.datetime, uuid.UUID]] = []
+# expired warnings the moderation log has not been told about yet
+_unreported: list["DiscordWarning"] = []
+# set whenever the earliest expiry might have changed, wakes up the expiry scheduler
+changed: asyncio.Event = asyncio.Event()
+# user id -> name, to display warnings without keeping user objects around, snapshotted to a file
+_names: dict[int, str] = {}
 
 
 class DiscordWarning:
@@ -13,27 +48,29 @@ class DiscordWarning:
     A warning.
     """
 
-    def __init__(self, user: User | Member, reason: str, moderator: User | Member, given: datetime.datetime,
+    __slots__ = ("id", "user_id", "reason", "moderator_id", "given", "expires")
+
+    def __init__(self, user_id: int, reason: str, moderator_id: int, given: datetime.datetime,
                  expires: datetime.datetime, id: uuid.UUID = None):
-        self.id = uuid.uuid4() if id is None else id
-        self.user: User = user
+        self.id: uuid.UUID = uuid.uuid4() if id is None else id
+        self.user_id: int = user_id
         self.reason: str = reason
-        self.moderator: User = moderator
+        self.moderator_id: int = moderator_id
         self.given: datetime.datetime = given
         self.expires: datetime.datetime = expires
 
     def __str__(self):
         return f"ID: **{self.id}**" \
-               f"\nUser: **{self.user.name}**" \
+               f"\nUser: **{get_name(self.user_id)}**" \
                f"\nExpires: **{self.expires.strftime('%Y-%m-%d %H:%M')}**" \
                f"\n{self.reason} - {self.given.strftime('%Y-%m-%d %H:%M')}"
 
     def to_json(self) -> dict:
         return {
             "id": str(self.id),
-            "user": str(self.user.id),
+            "user": str(self.user_id),
             "reason": self.reason,
-            "moderator": str(self.moderator.id),
+            "moderator": str(self.moderator_id),
             "given": self.given.strftime('%Y-%m-%d %H:%M'),
             "expires": self.expires.strftime('%Y-%m-%d %H:%M')
         }
@@ -42,19 +79,84 @@ class DiscordWarning:
         if reason is not None:
             self.reason = reason
         if expires is not None:
+            _remove_sorted(_by_expires, self, _expires_key)
             self.expires = expires
+            bisect.insort(_by_expires, self, key=_expires_key)
+            heapq.heappush(_expiry, (expires, self.id))
+            changed.set()
+        _database.submit(lambda connection: connection.execute(
+            "UPDATE warnings SET reason = ?, expires = ? WHERE id = ?",
+            (self.reason, self.expires.isoformat(), str(self.id))))
+
+    def to_row(self) -> tuple:
+        return (str(self.id), self.user_id, self.reason, self.moderator_id, self.given.isoformat(),
+                self.expires.isoformat())
+
+
+def _create(connection: sqlite3.Connection) -> None:
+    connection.execute("CREATE TABLE IF NOT EXISTS warnings ("
+                       "id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, reason TEXT NOT NULL, "
+                       "moderator_id INTEGER NOT NULL, given TEXT NOT NULL, expires TEXT NOT NULL)")
+    connection.execute("CREATE INDEX IF NOT EXISTS warnings_user ON warnings (user_id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS warnings_moderator ON warnings (moderator_id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS warnings_expires ON warnings (expires)")
+
+
+_database: database.Database = database.Database("warnings.db", _create)
+
+
+def get_name(user_id: int) -> str:
+    return _names.get(user_id, str(user_id))
 
 
-def generate_expiration(user: User) -> datetime.datetime:
+def set_name(user_id: int, name: str) -> None:
+    if _names.get(user_id) != name:
+        _names[user_id] = name
+        storage.write_json(_names_file, {str(key): value for key, value in _names.items()})
+
+
+async def resolve_names(bot: commands.Bot, user_ids: set[int], refresh: bool = False) -> None:
     """
-    Generates the expiration date of the next warning of a user.
+    Fetches the names of users that are not known yet, or of all of them when refreshing.
     """
-    update_warnings()
+    limit: asyncio.Semaphore = asyncio.Semaphore(_concurrent_fetches)
+    names: dict[int, str] = {}
 
-    if user.id not in _warnings:
-        _warnings[user.id] = []
+    async def resolve(user_id: int) -> None:
+        async with limit:
+            # a user that cannot be fetched right now keeps the name known so far
+            try:
+                names[user_id] = (await bot.getch_user(user_id)).name
+            except HTTPException:
+                pass
 
-    user_warnings: list[DiscordWarning] = get_warnings_by_user(user)
+    await asyncio.gather(*(resolve(user_id) for user_id in user_ids if refresh or user_id not in _names))
+    if any(_names.get(user_id) != name for user_id, name in names.items()):
+        _names.update(names)
+        storage.write_json(_names_file, {str(key): value for key, value in _names.items()})
+
+
+def warm_names(bot: commands.Bot) -> None:
+    """
+    Refreshes the names of everyone involved in a warning once in the background, the snapshot covers them until then.
+    """
+    if _warmup is None:
+        this._warmup = asyncio.create_task(resolve_names(bot, set(_by_user) | set(_by_moderator), refresh=True))
+        this._warmup.add_done_callback(_report_warmup)
+
+
+def _report_warmup(task: asyncio.Task) -> None:
+    # a failed refresh is tried again the next time the bot gets ready
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Refreshing the names of warned users failed", exc_info=task.exception())
+        this._warmup = None
+
+
+def generate_expiration(user_id: int) -> datetime.datetime:
+    """
+    Generates the expiration date of the next warning of a user.
+    """
+    user_warnings: list[DiscordWarning] = get_warnings_by_user(user_id)
 
     match len(user_warnings):
         case 0:
@@ -64,51 +166,78 @@ def generate_expiration(user: User) -> datetime.datetime:
         case 2:
             return user_warnings[-1].expires + datetime.timedelta(days=1)
         case _:
-            raise Exception(f"User {user.name} has more than 2, or negative warnings.")
+            raise Exception(f"User {get_name(user_id)} has more than 2, or negative warnings.")
+
+
+def _given_key(warning: DiscordWarning) -> tuple[datetime.datetime, str]:
+    return warning.given, str(warning.id)
+
+
+def _expires_key(warning: DiscordWarning) -> tuple[datetime.datetime, str]:
+    return warning.expires, str(warning.id)
+
+
+def _remove_sorted(index: list[DiscordWarning], warning: DiscordWarning,
+                   key: Callable[[DiscordWarning], tuple[datetime.datetime, str]]) -> None:
+    del index[bisect.bisect_left(index, key(warning), key=key)]
 
 
-def add_warning(warning: DiscordWarning) -> int:
+def _index(warning: DiscordWarning) -> None:
+    _by_id[warning.id] = warning
+    _by_user.setdefault(warning.user_id, []).append(warning)
+    _by_moderator.setdefault(warning.moderator_id, []).append(warning)
+    bisect.insort(_by_given, warning, key=_given_key)
+    bisect.insort(_by_expires, warning, key=_expires_key)
+    heapq.heappush(_expiry, (warning.expires, warning.id))
+
+
+def _unindex(warning: DiscordWarning) -> None:
+    del _by_id[warning.id]
+    _remove_sorted(_by_given, warning, _given_key)
+    _remove_sorted(_by_expires, warning, _expires_key)
+    for index, key in [(_by_user, warning.user_id), (_by_moderator, warning.moderator_id)]:
+        index[key].remove(warning)
+        if not index[key]:
+            del index[key]
+
+
+async def add_warning(warning: DiscordWarning) -> int:
     """
-    Adds a warning. Returns the number of warnings of the user.
+    Adds a warning once it is written. Returns the number of warnings of the user.
     """
-    _warnings[warning.user.id].append(warning)
-    write_warnings()
-    return len(_warnings[warning.user.id])
+    await _database.run(lambda connection: connection.execute("INSERT INTO warnings VALUES (?, ?, ?, ?, ?, ?)",
+                                                              warning.to_row()))
+    _index(warning)
+    changed.set()
+    return len(_by_user[warning.user_id])
 
 
-def delete_warning(warning: DiscordWarning) -> None:
+async def delete_warning(warning: DiscordWarning) -> None:
     """
-    Removes a warning.
+    Removes a warning once it is deleted from the database.
     """
-    _warnings[warning.user.id].remove(warning)
-    write_warnings()
+    await _database.run(lambda connection: connection.execute("DELETE FROM warnings WHERE id = ?",
+                                                              (str(warning.id),)))
+    # it may have expired while it was being deleted
+    if warning.id in _by_id:
+        _unindex(warning)
+    changed.set()
 
 
-def get_warnings_by_user(user: User) -> list[DiscordWarning] | None:
+def get_warnings_by_user(user_id: int) -> list[DiscordWarning]:
     """
     Returns all warnings of a user.
     """
     update_warnings()
-
-    try:
-        return _warnings[user.id]
-    except KeyError:
-        return None
+    return list(_by_user.get(user_id, []))
 
 
-def get_warnings_by_moderator(moderator: User) -> list[DiscordWarning]:
+def get_warnings_by_moderator(moderator_id: int) -> list[DiscordWarning]:
     """
     Returns all warnings of a moderator.
     """
     update_warnings()
-
-    warnings: list[DiscordWarning] = []
-    for key, value in _warnings.items():
-        for warning in value:
-            if warning.moderator == moderator:
-                warnings.append(warning)
-
-    return warnings
+    return list(_by_moderator.get(moderator_id, []))
 
 
 def get_all_warnings() -> list[DiscordWarning]:
@@ -116,12 +245,39 @@ def get_all_warnings() -> list[DiscordWarning]:
     Returns all warnings.
     """
     update_warnings()
+    return list(_by_id.values())
 
-    warnings: list[DiscordWarning] = []
-    for value in _warnings.values():
-        warnings.extend(value)
 
-    return warnings
+def get_page(page: int, per_page: int, user_id: int | None = None, moderator_id: int | None = None,
+             expires_within: datetime.timedelta | None = None) -> tuple[list[DiscordWarning], int]:
+    """
+    Returns a page of the warnings matching the filters and how many match in total.
+    With at most one filter the page is sliced straight from a sorted index, only combined filters look at every
+    warning of the user or moderator. Warnings expiring within a window are sorted by their expiry date.
+    """
+    update_warnings()
+
+    if user_id is not None or moderator_id is not None:
+        warnings: list[DiscordWarning] = _by_user.get(user_id, []) if user_id is not None \
+            else _by_moderator.get(moderator_id, [])
+        if (user_id is not None and moderator_id is not None) or expires_within is not None:
+            until: datetime.datetime | None = None if expires_within is None \
+                else datetime.datetime.utcnow() + expires_within
+            warnings = [warning for warning in warnings
+                        if (moderator_id is None or warning.moderator_id == moderator_id)
+                        and (until is None or warning.expires <= until)]
+        start, end = 0, len(warnings)
+    elif expires_within is not None:
+        # expired warnings are gone already, so the window starts at the first one
+        warnings = _by_expires
+        start = 0
+        end = bisect.bisect_right(warnings, (datetime.datetime.utcnow() + expires_within, "~"), key=_expires_key)
+    else:
+        warnings = _by_given
+        start, end = 0, len(warnings)
+
+    first: int = start + (page - 1) * per_page
+    return warnings[first:min(first + per_page, end)], end - start
 
 
 def get_warning(id: uuid.UUID) -> DiscordWarning:
@@ -130,59 +286,107 @@ def get_warning(id: uuid.UUID) -> DiscordWarning:
     """
     update_warnings()
 
-    for key, value in _warnings.items():
-        for warning in value:
-            if warning.id == id:
-                return warning
+    try:
+        return _by_id[id]
+    except KeyError:
+        raise Exception(f"Warning with UUID {id} not found.")
+
 
-    raise Exception(f"Warning with UUID {id} not found.")
+def next_expiry() -> datetime.datetime | None:
+    """
+    Returns the earliest expiry date, dropping outdated heap entries on the way.
+    """
+    while _expiry:
+        expires, id = _expiry[0]
+        warning: DiscordWarning | None = _by_id.get(id)
+        if warning is not None and warning.expires == expires:
+            return expires
+        heapq.heappop(_expiry)
+    return None
 
 
-def update_warnings() -> None:
+def take_expired() -> list[DiscordWarning]:
     """
-    Updates the warnings file.
+    Returns the warnings that expired since the last call, however they were expired.
     """
-    for key, value in _warnings.items():
-        for warning in value:
-            if warning.expires < datetime.datetime.utcnow():
-                _warnings[key].remove(warning)
+    expired: list[DiscordWarning] = list(_unreported)
+    _unreported.clear()
+    return expired
 
 
-async def from_json(json_data: dict, bot: commands.Bot) -> DiscordWarning:
+def update_warnings() -> list[DiscordWarning]:
+    """
+    Removes the expired warnings in one batch. Returns them.
+    """
+    expired: list[DiscordWarning] = []
+    now: datetime.datetime = datetime.datetime.utcnow()
+    while _expiry and _expiry[0][0] < now:
+        expires, id = heapq.heappop(_expiry)
+        warning: DiscordWarning | None = _by_id.get(id)
+        # deleted warnings and outdated expiry dates of edited ones are skipped
+        if warning is not None and warning.expires == expires:
+            _unindex(warning)
+            expired.append(warning)
+
+    if expired:
+        _unreported.extend(expired)
+        changed.set()
+        ids: list[tuple[str]] = [(str(warning.id),) for warning in expired]
+        _database.submit(lambda connection: connection.executemany("DELETE FROM warnings WHERE id = ?", ids))
+    return expired
+
+
+def from_json(json_data: dict) -> DiscordWarning:
     id: uuid.UUID = uuid.UUID(json_data["id"])
-    user: User = await bot.getch_user(int(json_data["user"]))
+    user_id: int = int(json_data["user"])
     reason: str = json_data["reason"]
-    moderator: User = await bot.getch_user(int(json_data["moderator"]))
+    moderator_id: int = int(json_data["moderator"])
     given: datetime.datetime = datetime.datetime.fromisoformat(json_data["given"])
     expires: datetime.datetime = datetime.datetime.fromisoformat(json_data["expires"])
 
-    return DiscordWarning(user, reason, moderator, given, expires, id)
+    return DiscordWarning(user_id, reason, moderator_id, given, expires, id)
+
 
+def from_row(row: tuple) -> DiscordWarning:
+    id, user_id, reason, moderator_id, given, expires = row
+    return DiscordWarning(user_id, reason, moderator_id, datetime.datetime.fromisoformat(given),
+                          datetime.datetime.fromisoformat(expires), uuid.UUID(id))
 
-def write_warnings() -> None:
+
+def _migrate(connection: sqlite3.Connection) -> None:
     """
-    Writes the warnings to the file.
+    Moves the warnings from the old json file into the database.
     """
-    warnings_json: dict = {}
-    for key, value in _warnings.items():
-        warnings_json[key] = []
-        for warning in value:
-            warnings_json[key].append(warning.to_json())
-
-    with open("warnings.json", "w", encoding="utf-8") as file:
-        json.dump(warnings_json, file, indent=4)
+    with open(_legacy_file, "r", encoding="utf-8") as file:
+        warnings_json = json.load(file)
+    connection.executemany("INSERT OR IGNORE INTO warnings VALUES (?, ?, ?, ?, ?, ?)",
+                           [from_json(warning_json).to_row()
+                            for value in warnings_json.values() for warning_json in value])
+    # the file is only renamed once the rows are committed, a crash in between repeats the ignored inserts
+    connection.commit()
+    os.replace(_legacy_file, _legacy_file + ".migrated")
 
 
-async def init_warnings(bot: commands.Bot) -> None:
+async def init_warnings() -> None:
     """
-    Reads the warnings from the file.
+    Reads the warnings and the snapshot of the names, once, so reconnecting does not load them again.
+    Warnings still in the old json file are migrated into the database first.
     """
-    with open("warnings.json", "r", encoding="utf-8") as file:
-        warnings_json = json.load(file)
-    global _warnings
+    # everyone initializing at the same time waits for the same load
+    if _loading is None:
+        this._loading = asyncio.create_task(_load())
+    await _loading
+
+
+async def _load() -> None:
+    def load(connection: sqlite3.Connection) -> list[tuple]:
+        if os.path.exists(_legacy_file):
+            _migrate(connection)
+        return connection.execute("SELECT id, user_id, reason, moderator_id, given, expires FROM warnings "
+                                  "ORDER BY given").fetchall()
+
+    for row in await _database.run(load):
+        _index(from_row(row))
 
-    for key, value in warnings_json.items():
-        _warnings[int(key)] = []
-        for warning_json in value:
-            warning: DiscordWarning = await from_json(warning_json, bot)
-            _warnings[int(key)].append(warning)
+    for user_id, name in storage.read_json(_names_file, {}).items():
+        _names[int(user_id)] = name
@@ -0,0 +1,51 @@
+"""
+Measures what writing a warning costs as the warnings table grows. Run with python test/benchmark_warnings.py,
+the time per warning should stay about the same for every size.
+"""
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "etbot"))
+
+from vars import warnings  # noqa: E402
+
+_sizes: list[int] = [1_000, 10_000, 100_000]
+# warnings written and timed at every size
+_samples: int = 1_000
+
+
+def _warning(user_id: int) -> warnings.DiscordWarning:
+    now: datetime.datetime = datetime.datetime.utcnow()
+    return warnings.DiscordWarning(user_id, "benchmark", 1, now, now + datetime.timedelta(days=30))
+
+
+async def _fill(size: int) -> None:
+    """
+    Grows the table to a size in one transaction, the filling is not timed.
+    """
+    missing: list[warnings.DiscordWarning] = [_warning(user_id) for user_id in range(len(warnings._by_id), size)]
+    await warnings._database.run(lambda connection: connection.executemany(
+        "INSERT INTO warnings VALUES (?, ?, ?, ?, ?, ?)", [warning.to_row() for warning in missing]))
+    for warning in missing:
+        warnings._index(warning)
+
+
+async def main() -> None:
+    await warnings.init_warnings()
+    for size in _sizes:
+        await _fill(size)
+        start: float = time.perf_counter()
+        for user_id in range(size, size + _samples):
+            await warnings.add_warning(_warning(user_id))
+        elapsed: float = time.perf_counter() - start
+        print(f"{size:>7} warnings: {elapsed / _samples * 1e6:.0f} µs per written warning")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        asyncio.run(main())
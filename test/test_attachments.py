@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "etbot"))
+
+from vars import attachments  # noqa: E402
+
+_files: dict[str, bytes] = {
+    "a": b"a" * 100,
+    "b": b"b" * 100,
+    "same": b"a" * 100,
+    "c": b"c" * 300,
+}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(attachments, "_max_size", 2 * 1024 ** 3)
+    attachments.init_attachments()
+    yield attachments
+    attachments._stored.clear()
+    attachments._size = 0
+
+
+async def _serve(files: list[tuple[str, str, int]], budget: attachments.Budget) -> dict[str, str]:
+    """
+    Stores files from a local server standing in for the discord cdn.
+    """
+    # the locks belong to the loop they are first used on, every test runs its own
+    attachments._download_limit = asyncio.Semaphore(attachments._concurrent_downloads)
+    attachments._lock = asyncio.Lock()
+
+    async def handle(request: web.Request) -> web.Response:
+        name: str = request.match_info["name"]
+        if name not in _files:
+            return web.Response(status=404)
+        return web.Response(body=_files[name])
+
+    app: web.Application = web.Application()
+    app.router.add_get("/{name}", handle)
+    runner: web.AppRunner = web.AppRunner(app)
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port: int = runner.addresses[0][1]
+    try:
+        return await attachments.store_urls([(f"http://127.0.0.1:{port}/{name}", filename, size)
+                                             for name, filename, size in files], budget)
+    finally:
+        await runner.cleanup()
+
+
+def _names(stored: dict[str, str]) -> dict[str, str]:
+    return {url.rsplit("/", 1)[1]: digest for url, digest in stored.items()}
+
+
+def test_identical_downloads_are_stored_once(store):
+    stored: dict[str, str] = _names(asyncio.run(_serve([("a", "a.png", 100), ("same", "same.png", 100),
+                                                        ("a", "again.png", 100)], attachments.Budget(1000))))
+
+    assert stored["a"] == stored["same"]
+    assert len(store._stored) == 1
+    assert store._size == 100
+    assert os.path.exists(store._path(stored["a"]))
+    assert os.listdir(os.path.dirname(store._path(stored["a"]))) == [stored["a"]]
+
+
+def test_existing_files_count_as_stored(store):
+    first: dict[str, str] = _names(asyncio.run(_serve([("a", "a.png", 100)], attachments.Budget(1000))))
+    second: dict[str, str] = _names(asyncio.run(_serve([("same", "same.png", 100)], attachments.Budget(1000))))
+
+    assert first["a"] == second["same"]
+    assert store._size == 100
+
+
+def test_budget_skips_files(store):
+    budget: attachments.Budget = attachments.Budget(250)
+    stored: dict[str, str] = _names(asyncio.run(_serve([("a", "a.png", 100), ("c", "c.png", 300),
+                                                        ("b", "b.png", 100)], budget)))
+
+    assert set(stored) == {"a", "b"}
+    assert budget.remaining == 50
+
+
+def test_missing_files_are_not_stored(store):
+    stored: dict[str, str] = asyncio.run(_serve([("missing", "missing.png", 100)], attachments.Budget(1000)))
+
+    assert stored == {}
+    assert store._size == 0
+
+
+def test_least_recently_used_are_evicted(store, monkeypatch):
+    monkeypatch.setattr(attachments, "_max_size", 400)
+    first: dict[str, str] = _names(asyncio.run(_serve([("a", "a.png", 100), ("b", "b.png", 100)],
+                                                      attachments.Budget(1000))))
+    store.find(first["a"])
+    second: dict[str, str] = _names(asyncio.run(_serve([("c", "c.png", 300)], attachments.Budget(1000))))
+
+    # a was looked up after b was stored, so b is the least recently used
+    assert list(store._stored) == [first["a"], second["c"]]
+    assert store._size == 400
+    assert os.path.exists(store._path(first["a"]))
+    assert not os.path.exists(store._path(first["b"]))
+
+    store.init_attachments()
+    assert list(store._stored) == [first["a"], second["c"]]
+    assert store._size == 400
+
+
+def test_concurrent_writes_of_the_same_data(store):
+    async def write() -> list[str]:
+        return await asyncio.gather(*(asyncio.to_thread(attachments._write, b"d" * 100000) for _ in range(16)))
+
+    digests: list[str] = asyncio.run(write())
+
+    assert len(set(digests)) == 1
+    assert os.listdir(os.path.dirname(store._path(digests[0]))) == [digests[0]]
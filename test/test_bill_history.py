@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "etbot"))
+
+from vars import bill_history  # noqa: E402
+
+_wordings: list[str] = [
+    "Raises the tax on grain.",
+    "Raises the tax on grain and wine.",
+    "Lowers the tax on grain and wine.",
+    "Lowers the tax on grain and wine.\nThe revenue goes to the fleet.",
+    "Lowers the  tax on wine.\nThe revenue goes to the fleet.",
+    "",
+    "  Builds a road.\n\n",
+    "Builds a road to the capital.",
+    "Builds a road to the capital and a bridge.",
+    "Builds a bridge.",
+]
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield bill_history
+    bill_history._histories.clear()
+
+
+@pytest.mark.parametrize("old, new", list(zip(_wordings, _wordings[1:])))
+def test_delta_round_trip(old, new):
+    assert bill_history._apply(old, bill_history._delta(old, new)) == new
+
+
+def test_delta_of_unchanged_text_is_empty():
+    assert bill_history._delta(_wordings[0], _wordings[0]) == []
+
+
+def test_versions_round_trip(history):
+    # more versions than fit between two full texts, so deltas on both sides of one are rebuilt
+    for wording in _wordings:
+        history.add_version(5, wording)
+
+    assert history.version_count(5) == len(_wordings)
+    assert [history.get_version(5, version) for version in range(len(_wordings))] == _wordings
+
+    # the versions are read back from the file
+    history._histories.clear()
+    assert [history.get_version(5, version) for version in range(len(_wordings))] == _wordings
+
+
+def test_only_every_nth_version_is_stored_in_full(history):
+    for wording in _wordings:
+        history.add_version(5, wording)
+
+    full: list[int] = [version for version, stored in enumerate(history._load(5)) if "text" in stored]
+    assert full == list(range(0, len(_wordings), bill_history._full_interval))
+
+
+def test_diff(history):
+    history.add_version(5, _wordings[0])
+    history.add_version(5, _wordings[1])
+
+    assert history.diff(5, 0, 1).splitlines() == ["--- version 0", "+++ version 1", "@@ -1 +1 @@",
+                                                  f"-{_wordings[0]}", f"+{_wordings[1]}"]
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "etbot"))
+
+import bill_parser  # noqa: E402
+from cogs import senate  # noqa: E402
+from vars import roles  # noqa: E402
+
+_senator_id: int = 11
+_tribune_id: int = 12
+
+
+class _Role:
+    """
+    Stands in for a role, which only has to be mentioned.
+    """
+
+    def __init__(self, role_id: int):
+        self.id: int = role_id
+        self.mention: str = f"<@&{role_id}>"
+
+
+@pytest.fixture(autouse=True)
+def senate_roles(monkeypatch):
+    monkeypatch.setattr(roles, "senator", _Role(_senator_id))
+    monkeypatch.setattr(roles, "tribune", _Role(_tribune_id))
+
+
+def test_assembled_bill():
+    text: str = "Raises the tax on grain.\nThe revenue goes to the fleet."
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(senate.assemble_bill(text, 12, "<@123>"))
+
+    assert parsed is not None
+    assert parsed.number == 12
+    assert parsed.parent is None
+    assert not parsed.is_amendment()
+    assert parsed.heading == "**Bill 12:**"
+    assert parsed.body == text
+    assert parsed.author == "<@123>"
+    assert parsed.author_id == 123
+    assert parsed.role_ids == [_senator_id, _tribune_id]
+    assert parsed.mentions(roles.senator)
+    assert parsed.wording() == f"**Bill 12:** \r\n{text}"
+
+
+def test_assembled_amendment():
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(
+        senate.assemble_amendment("Halves the tax instead.", 13, 12, "<@123>"))
+
+    assert parsed is not None
+    assert parsed.number == 13
+    assert parsed.parent == 12
+    assert parsed.is_amendment()
+    assert parsed.heading == "**Bill 13:** Amendment to **Bill 12**"
+    assert parsed.body == "Halves the tax instead."
+    assert parsed.author_id == 123
+
+
+def test_nickname_mention_as_author():
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(
+        senate.assemble_bill("Builds a road.", 4, "<@!123>"))
+
+    assert parsed is not None
+    assert parsed.author == "<@!123>"
+    assert parsed.author_id == 123
+
+
+def test_irregular_spacing():
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(
+        "  **Bill  7 :**Amendment to **Bill3**\n\n  Builds a bridge.  \nBill by:<@5>\n<@&11>   <@&12>  ")
+
+    assert parsed is not None
+    assert parsed.number == 7
+    assert parsed.parent == 3
+    assert parsed.body == "Builds a bridge."
+    assert parsed.author_id == 5
+    assert parsed.role_ids == [_senator_id, _tribune_id]
+
+
+@pytest.mark.parametrize("text", [
+    "Replaces the line Bill by: <@9> in Bill 2.",
+    "Names the author of the motion.\nBill by: <@9>",
+])
+def test_body_containing_bill_by(text):
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content(senate.assemble_bill(text, 8, "<@123>"))
+
+    assert parsed is not None
+    assert parsed.body == text
+    assert parsed.author_id == 123
+
+
+def test_bill_without_author():
+    parsed: bill_parser.ParsedBill | None = bill_parser.parse_content("**Bill 2:** \r\nBuilds a wall. \r\n<@&11>")
+
+    assert parsed is not None
+    assert parsed.body == "Builds a wall."
+    assert parsed.author is None
+    assert parsed.author_id is None
+    assert parsed.role_ids == [_senator_id]
+
+
+@pytest.mark.parametrize("content", ["", "Bill 2: Builds a wall.", "The **Bill 2:** is bad."])
+def test_no_bill(content):
+    assert bill_parser.parse_content(content) is None